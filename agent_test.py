@@ -7,10 +7,23 @@ import unittest
 
 import isolation
 import game_agent
+import competition_agent
+import parallel_agent
+import search_stats
+import sample_players
+import benchmark
+import tournament
+import ast
+import contextlib
 import datetime
+import io
+import json
+import os
 import random
+import tempfile
 
 from importlib import reload
+from unittest import mock
 random.seed(1)
 
 
@@ -27,6 +40,11 @@ class IsolationTest(unittest.TestCase):
         self.player2 = "Player2"
         self.game = isolation.Board(self.player1, self.player2)
 
+    def keep_random_state(self):
+        """Restore the global random state once the test ends, so that the
+        timer draws of the other tests do not depend on this one."""
+        self.addCleanup(random.setstate, random.getstate())
+
     def test_MinimaxPlayer_legal_move(self):
         self.setUp()
         self.game.apply_move((2, 1))
@@ -43,6 +61,520 @@ class IsolationTest(unittest.TestCase):
         legal_moves = self.game.get_legal_moves(self.player1)
         self.assertTrue(move in legal_moves)
 
+    def test_AlphaBetaPlayer_transposition_table(self):
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        for replacement in game_agent.TranspositionTable.REPLACEMENT_SCHEMES:
+            table = game_agent.TranspositionTable(capacity=256, replacement=replacement)
+            player = game_agent.AlphaBetaPlayer(transposition_table=table)
+            player.time_left = lambda: 1000.
+            self.assertEqual(player._alphabeta(self.game, 3)[0],
+                             player._alphabeta(self.game, 3)[0])
+            self.assertGreater(table.hits, 0)
+            move = player.alphabeta(self.game, 3)
+            self.assertIn(move, self.game.get_legal_moves(self.player1))
+
+            # The smallest table holds one bucket; an empty one is rejected
+            min_capacity = 2 if replacement == "two-tier" else 1
+            self.assertRaises(ValueError, game_agent.TranspositionTable,
+                              capacity=min_capacity - 1, replacement=replacement)
+            table = game_agent.TranspositionTable(capacity=min_capacity,
+                                                  replacement=replacement)
+            table.store(12345, 2, 1., game_agent.EXACT, (0, 0))
+            self.assertEqual(table.probe(12345)[:5],
+                             (12345, 2, 1., game_agent.EXACT, (0, 0)))
+
+    def test_AlphaBetaPlayer_move_ordering(self):
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        plain = game_agent.AlphaBetaPlayer()
+        plain.time_left = lambda: 1000.
+        for ordering in [game_agent.MoveOrdering(),
+                         game_agent.MoveOrdering(static_score=game_agent.onward_moves)]:
+            player = game_agent.AlphaBetaPlayer(move_ordering=ordering)
+            player.time_left = lambda: 1000.
+            for depth in range(1, 5):
+                self.assertEqual(plain._alphabeta(self.game, depth)[0],
+                                 player._alphabeta(self.game, depth)[0])
+            moves = self.game.get_legal_moves()
+            self.assertEqual(sorted(ordering.order(self.game, moves)), sorted(moves))
+
+    def test_AlphaBetaPlayer_pvs(self):
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        plain = game_agent.AlphaBetaPlayer()
+        plain.time_left = lambda: 1000.
+        player = game_agent.AlphaBetaPlayer(search="pvs", move_ordering=game_agent.MoveOrdering())
+        player.time_left = lambda: 1000.
+        for depth in range(1, 5):
+            self.assertEqual(plain._alphabeta(self.game, depth)[0],
+                             player._pvs(self.game, depth)[0])
+        move = player.alphabeta(self.game, 3)
+        self.assertIn(move, self.game.get_legal_moves(self.player1))
+        self.assertRaises(ValueError, game_agent.AlphaBetaPlayer, search="mtdf")
+
+    def test_AlphaBetaPlayer_aspiration_windows(self):
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        plain = game_agent.AlphaBetaPlayer()
+        plain.time_left = lambda: 1000.
+        player = game_agent.AlphaBetaPlayer(aspiration_windows=(0.5, 2.))
+        player.time_left = lambda: 1000.
+        for depth in range(1, 5):
+            value, _ = plain._search_root(self.game, depth)
+            for guess in [value - 10, value, value + 10]:
+                self.assertEqual(value, player._aspiration_search(self.game, depth, guess)[0])
+        stats = player.aspiration_stats
+        self.assertGreater(stats["fail_low"], 0)
+        self.assertGreater(stats["fail_high"], 0)
+        self.assertEqual(stats["window"], 1.)
+
+    def test_TimeManager_predicts_iterations(self):
+        self.keep_random_state()
+        self.setUp()
+        manager = game_agent.TimeManager(default_ebf=4., opening_factor=0.5)
+        manager.start(self.game, 100.)
+        self.assertEqual(manager.budget, 50.)
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        self.game.apply_move((0, 0))
+        manager = game_agent.TimeManager(default_ebf=4., opening_blanks=1.)
+        manager.start(self.game, 100.)
+        self.assertEqual(manager.budget, 100.)
+        self.assertTrue(manager.should_start(1, 0.))
+        manager.record(5.)
+        self.assertTrue(manager.should_start(2, 5.))
+        manager.record(15.)
+        self.assertEqual(manager.ebf, 3.)
+        self.assertTrue(manager.should_start(3, 20.))
+        manager.record(45.)
+        self.assertFalse(manager.should_start(4, 65.))
+        self.assertFalse(manager.should_start(47, 0.))
+
+    def test_check_interval_polls_clock_less(self):
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        polls = {}
+        for interval in [1, 16, "auto"]:
+            calls = []
+            player = game_agent.AlphaBetaPlayer(check_interval=interval)
+            player._start_clock(lambda: calls.append(1) or 1000. - len(calls))
+            self.assertIn(player.alphabeta(self.game, 4), self.game.get_legal_moves())
+            polls[interval] = len(calls)
+        self.assertLess(polls[16], polls[1] / 8)
+        self.assertLess(polls["auto"], polls[1])
+
+        player = game_agent.AlphaBetaPlayer(check_interval=16)
+        player._start_clock(lambda: 5.)
+        self.assertRaises(game_agent.SearchTimeout, player.alphabeta, self.game, 4)
+
+    def test_search_root_moves_splits_root(self):
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        for search in ["alphabeta", "pvs"]:
+            player = parallel_agent.ParallelAlphaBetaPlayer(search=search)
+            player.time_left = lambda: 1000.
+            moves = self.game.get_legal_moves()
+            for depth in range(1, 4):
+                value, _ = player._search_root(self.game, depth)
+                shares = [parallel_agent.search_root_moves(player, self.game, moves[i::2], depth)
+                          for i in range(2)]
+                self.assertEqual(value, max(shares)[0])
+        results = [[(1, 2., (0, 0)), (2, 1., (0, 2))], [(1, 3., (4, 0))]]
+        self.assertEqual(player._merge_results(results), (4, 0))
+        player.parallel_mode = "lazy"
+        self.assertEqual(player._merge_results(results), (0, 2))
+
+    def test_CustomPlayer_mcts(self):
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        for widening in [None, (1., 0.5)]:
+            player = competition_agent.CustomPlayer(widening=widening)
+            root = competition_agent.MCTSNode(self.game)
+            before = (self.game.to_string(), self.game.hash())
+            for _ in range(200):
+                player._playout(root, self.game)
+            self.assertEqual(before, (self.game.to_string(), self.game.hash()))
+            self.assertEqual(root.visits, 200)
+            self.assertEqual(sum(c.visits for c in root.children), 200)
+        clock = iter(range(300, -1, -1))
+        move = player.get_move(self.game.copy(), lambda: next(clock))
+        self.assertIn(move, self.game.get_legal_moves())
+        self.assertGreater(player.playouts_per_second, 0)
+        self.game.apply_move(move)
+        reply = self.game.get_legal_moves()[0]
+        subtree = [c for c in player._root.children if c.move == reply][0]
+        self.game.apply_move(reply)
+        self.assertIs(player._find_root(self.game), subtree)
+
+    def test_CustomPlayer_timed_games(self):
+        self.keep_random_state()
+        self.setUp()
+        mcts = competition_agent.CustomPlayer(timeout=10.)
+        for mcts_first in (True, False):
+            opponent = game_agent.AlphaBetaPlayer()
+            players = (mcts, opponent) if mcts_first else (opponent, mcts)
+            game = isolation.Board(*players)
+            game.apply_move((2, 1))
+            game.apply_move((4, 4))
+            _, history, termination = game.play(time_limit=150)
+            self.assertNotEqual(termination, "timeout", history)
+
+    def test_EndgameSolver_partitions(self):
+        self.keep_random_state()
+        self.setUp()
+        solver = isolation.EndgameSolver()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        self.assertIsNone(solver.solve(self.game))
+
+        game = isolation.Board(self.player1, self.player2, width=5, height=5)
+        for move in [(3, 3), (4, 4), (1, 2), (3, 2), (2, 4), (1, 3),
+                     (0, 3), (3, 4), (2, 2), (4, 2), (4, 1)]:
+            game.apply_move(move)
+        self.assertEqual(solver.solve(game), (8, 2, (3, 0)))
+        self.assertTrue(solver.active_player_wins(game))
+        player = game_agent.AlphaBetaPlayer(endgame=solver)
+        self.assertEqual(player.get_move(game, lambda: 1000.), (3, 0))
+
+        # A solve that runs out of time memoises nothing, and the player
+        # falls back to a legal move
+        def timeout():
+            raise game_agent.SearchTimeout()
+
+        solver = isolation.EndgameSolver(probe_region=4)
+        with self.assertRaises(game_agent.SearchTimeout):
+            solver.solve(game, timeout)
+        self.assertEqual(solver._memo, {})
+        self.assertIsNone(solver.active_player_wins(game))
+        player = game_agent.AlphaBetaPlayer(endgame=solver)
+        self.assertIn(player.get_move(game, lambda: 5.), game.get_legal_moves())
+
+        def active_player_wins(board):
+            for move in board.get_legal_moves():
+                board.push(move)
+                try:
+                    if not active_player_wins(board):
+                        return True
+                finally:
+                    board.pop()
+            return False
+
+        self.assertTrue(active_player_wins(game))
+
+    def test_EvaluationCache_wraps_score_fn(self):
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        plain = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score_3)
+        plain.time_left = lambda: 1000.
+        player = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score_3,
+                                            evaluation_cache=64)
+        player.time_left = lambda: 1000.
+        cache = player.score
+        self.assertIsInstance(cache, game_agent.EvaluationCache)
+        for _ in range(2):
+            self.assertEqual(plain._search_root(self.game, 2)[0],
+                             player._search_root(self.game, 2)[0])
+        self.assertGreater(cache.hits, 0)
+        self.assertEqual(cache.hit_rate, cache.hits / (cache.hits + cache.misses))
+        self.assertEqual(cache(self.game, self.player1),
+                         game_agent.custom_score_3(self.game, self.player1))
+        self.assertEqual(cache(self.game, self.player2),
+                         game_agent.custom_score_3(self.game, self.player2))
+        player._search_root(self.game, 3)
+        self.assertLessEqual(len(cache._values), 64)
+
+    def test_SearchStats_records_moves(self):
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        path = os.path.join(tempfile.mkdtemp(), "stats.jsonl")
+        stats = search_stats.SearchStats(path, label="AB")
+        player = game_agent.AlphaBetaPlayer(stats=stats, evaluation_cache=64)
+        clock = iter(range(10000, 0, -1))
+        move = player.get_move(self.game, lambda: 50. if next(clock) > 9000 else 0.)
+        self.assertIn(move, self.game.get_legal_moves())
+        self.assertEqual(type(self.game), isolation.Board)
+        self.assertGreater(player.score.score_fn.misses, 0)
+        record = stats.moves[0]
+        self.assertEqual(record["ply"], 2)
+        self.assertEqual(record["depth"], len(record["nodes"]))
+        self.assertGreater(record["depth"], 1)
+        self.assertEqual(record["ebf"], record["nodes"][-1] / record["nodes"][-2])
+        self.assertGreater(record["score_ms"], 0.)
+        self.assertGreater(record["movegen_ms"], 0.)
+        self.assertEqual(record["margin_ms"], 0.)
+        game = stats.end_game(won=True)
+        self.assertEqual(stats.moves, [])
+        with open(path) as f:
+            self.assertEqual(json.loads(f.read()), game)
+        self.assertEqual(game["label"], "AB")
+
+        # The instrumentation is kept out of the submission module, which
+        # may only import the modules allowed by the Project Assistant
+        allowed = {"random", "numpy", "scipy", "sklearn", "itertools", "math",
+                   "heapq", "collections", "array", "copy", "operator"}
+        with open(game_agent.__file__) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                self.assertIn(name.split(".")[0], allowed)
+
+    def test_benchmark_corpus_and_compare(self):
+        self.keep_random_state()
+        self.setUp()
+        corpus = benchmark.position_corpus("middlegame", size=5, seed=3)
+        self.assertEqual([g.hash() for g in corpus],
+                         [g.hash() for g in benchmark.position_corpus("middlegame", 5, 3)])
+        low, high = benchmark.PHASES["middlegame"]
+        self.assertTrue(all(low <= g.move_count < high and g.get_legal_moves()
+                            for g in corpus))
+        before = [g.to_string() for g in corpus]
+        moves = [(g, min(g.get_legal_moves())) for g in corpus]
+        self.assertGreater(benchmark.time_calls(benchmark.push_pop, moves, 1), 0)
+        self.assertEqual([g.to_string() for g in corpus], before)
+        self.assertGreater(benchmark.time_search("alphabeta", 2, corpus[:2], 1), 0)
+        baseline = {"copy/opening": {"us_per_call": 1.},
+                    "alphabeta/d5/opening": {"nodes_per_second": 1000.}}
+        results = {"copy/opening": {"us_per_call": 1.05},
+                   "alphabeta/d5/opening": {"nodes_per_second": 800.},
+                   "hash/opening": {"us_per_call": 1.}}
+        regressions = benchmark.compare(results, baseline, threshold=0.1)
+        self.assertEqual([r[0] for r in regressions], ["alphabeta/d5/opening"])
+        self.assertAlmostEqual(regressions[0][3], 0.25)
+
+    def test_node_limit_is_reproducible(self):
+        self.keep_random_state()
+        self.setUp()
+        results = []
+        for _ in range(2):
+            game = isolation.Board(self.player1, self.player2, seed=7, shuffle=True)
+            game.apply_move((2, 1))
+            game.apply_move((4, 4))
+            player = game_agent.AlphaBetaPlayer(node_limit=500,
+                                                move_ordering=game_agent.MoveOrdering())
+            random.seed()
+            move = player.get_move(game, lambda: 0.)
+            results.append((move, player.nodes_searched, game.get_legal_moves()))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][1], 501)
+        stats = search_stats.SearchStats()
+        player = game_agent.AlphaBetaPlayer(max_depth=3, check_interval=10, stats=stats)
+        player.get_move(game, lambda: 1000.)
+        self.assertEqual(stats.moves[0]["depth"], 3)
+        self.assertEqual(player.nodes_searched % 10, 1)
+
+    def test_search_terminal_nodes(self):
+        self.keep_random_state()
+        self.setUp()
+        positions = []
+        while self.game.get_legal_moves():
+            positions.append(self.game.copy())
+            self.game.apply_move(min(self.game.get_legal_moves()))
+        for search in ("alphabeta", "pvs"):
+            player = game_agent.AlphaBetaPlayer(search=search,
+                                                score_fn=game_agent.custom_score_2)
+            player.time_left = lambda: 1000.
+            self.assertEqual(player.alphabeta(self.game, 3), (-1, -1))
+            self.assertEqual(player._search_root(self.game, 3)[0], float("-inf"))
+            # The player to move before the last move has a forced win
+            self.assertEqual(player._search_root(positions[-1], 3)[0], float("inf"))
+        player = game_agent.MinimaxPlayer(score_fn=game_agent.custom_score_2)
+        player.time_left = lambda: 1000.
+        self.assertEqual(player.minimax(self.game, 3), (-1, -1))
+
+    def test_board_slots_and_sides(self):
+        self.keep_random_state()
+        self.setUp()
+        self.assertFalse(hasattr(self.game, "__dict__"))
+        self.game.apply_move((2, 1))
+        self.assertEqual(self.game.active_player, self.player2)
+        self.assertEqual(self.game.get_opponent(self.player2), self.player1)
+        copy = self.game.copy_with_players("A", "B")
+        self.assertEqual((copy.active_player, copy.inactive_player), ("B", "A"))
+        self.assertEqual(copy.get_player_location("A"), (2, 1))
+        self.assertEqual(self.game.utility("stranger"), 0.)
+        self.assertFalse(self.game.is_winner("stranger"))
+        with self.assertRaises(RuntimeError):
+            self.game.get_opponent("stranger")
+        self.game.push((0, 0))
+        self.game.pop()
+        self.assertEqual(self.game.active_player, self.player2)
+        self.assertEqual(self.game.get_player_location(self.player2), None)
+
+    def test_tournament_parallel_games(self):
+        self.keep_random_state()
+        self.setUp()
+        games = tournament.round_games(0, 0, [1, 2], 2, seed=7)
+        self.assertEqual(len(games), 8)
+        self.assertEqual(games, tournament.round_games(0, 0, [1, 2], 2, seed=7))
+        self.assertNotEqual(games, tournament.round_games(0, 0, [1, 2], 2, seed=8))
+
+        # One logical CPU per core, and the affinity list when the core ids
+        # are unknown
+        cpuinfo = "".join("processor\t: {}\ncore id\t\t: {}\n\n".format(cpu, cpu % 2)
+                          for cpu in range(4))
+        with mock.patch("os.sched_getaffinity", return_value={0, 1, 2, 3}, create=True):
+            with mock.patch("tournament.open", mock.mock_open(read_data=cpuinfo),
+                            create=True):
+                self.assertEqual(tournament.physical_cores(), [0, 1])
+            cpuinfo = cpuinfo.replace("core id", "model name")
+            with mock.patch("tournament.open", mock.mock_open(read_data=cpuinfo),
+                            create=True):
+                self.assertEqual(tournament.physical_cores(), [0, 1, 2, 3])
+
+        # The pool returns the results in the order of the games
+        players = [sample_players.RandomPlayer() for _ in range(3)]
+        with tournament.game_runner(players) as run:
+            expected = list(run(games))
+        cores = tournament.physical_cores()
+        with mock.patch.object(tournament, "physical_cores", return_value=cores * 2):
+            with tournament.game_runner(players, workers=2) as run:
+                results = list(run(games))
+        self.assertEqual([r[0] for r in results], games)
+        self.assertEqual(results, expected)
+
+    def test_tournament_sprt(self):
+        self.keep_random_state()
+        self.setUp()
+        self.assertEqual(tournament.wilson_interval(0, 0), (0., 1.))
+        low, high = tournament.wilson_interval(75, 100)
+        self.assertAlmostEqual(low, 0.6570, places=4)
+        self.assertAlmostEqual(high, 0.8245, places=4)
+        self.assertAlmostEqual(tournament.sprt_llr(10, 0, 0., 50.), 1.3359, places=4)
+        self.assertAlmostEqual(tournament.sprt_llr(7, 3, 0., 50.),
+                               -tournament.sprt_llr(7, 3, 50., 0.))
+        self.assertAlmostEqual(tournament.sprt_llr(5, 5, -20., 20.), 0.)
+        ratings = tournament.elo_ratings({("a", "b"): (75, 25)}, prior=0)
+        self.assertAlmostEqual(ratings["a"] - ratings["b"], 190.85, places=2)
+        self.assertAlmostEqual(sum(ratings.values()), 0.)
+        ratings = tournament.elo_ratings({("a", "b"): (10, 0)})
+        self.assertGreater(ratings["a"], ratings["b"])
+
+        # The test stops at the same match whatever the batch size is
+        pairs = [(0, 2), (1, 2)]
+        rng = random.Random(0)
+        outcomes = {pair: [(rng.random() < p, rng.random() < p) for _ in range(40)]
+                    for pair, p in zip(pairs, (0.8, 0.5))}
+
+        def play(batch):
+            sprt = tournament.SequentialTest(pairs, 40)
+            streams = {pair: iter(outcomes[pair]) for pair in pairs}
+            while sprt.pending():
+                results = []
+                for pair in sprt.pending():
+                    for _ in range(min(batch, 40 - sprt.matches[pair])):
+                        for cpu_first, won in zip((True, False), next(streams[pair])):
+                            spec = tournament.GameSpec(0, pair[0], pair[1], cpu_first, (), 0)
+                            results.append((spec, won, "illegal move"))
+                sprt.record(results)
+            return sprt.matches, sprt.wins, sprt.decisions
+
+        expected = play(1)
+        self.assertEqual(expected[2][(0, 2)], "H1")
+        for batch in (2, 3, 8):
+            self.assertEqual(play(batch), expected)
+
+        with mock.patch("sys.argv", ["tournament.py", "--sprt", "-n", "0"]), \
+                contextlib.redirect_stderr(io.StringIO()), \
+                self.assertRaises(SystemExit):
+            tournament.main()
+
+    def test_canonical_form_symmetries(self):
+        self.keep_random_state()
+        self.setUp()
+        for width, height in [(7, 7), (5, 4)]:
+            tables = isolation.get_knight_tables(width, height)
+            self.assertEqual(len(tables.symmetries), 8 if width == height else 4)
+            game = isolation.Board(self.player1, self.player2, width, height)
+            for move in [(0, 1), (2, 2), (2, 0), (3, 1)]:
+                game.apply_move(move)
+            key, sym = game.canonical_form()
+            self.assertEqual(tables.symmetries[0], tuple(range(width * height)))
+            for perm in range(len(tables.symmetries)):
+                image = isolation.Board(self.player1, self.player2, width, height)
+                for move in [(0, 1), (2, 2), (2, 0), (3, 1)]:
+                    image.apply_move(tables.transform_move(move, perm))
+                self.assertEqual(image.canonical_form()[0], key)
+                if perm == sym:
+                    self.assertEqual(image.hash(), key)
+            for move in game.get_legal_moves():
+                canonical = tables.transform_move(move, sym)
+                self.assertEqual(tables.transform_move(canonical, sym, inverse=True), move)
+
+        plain = game_agent.AlphaBetaPlayer()
+        plain.time_left = lambda: 1000.
+        table = game_agent.TranspositionTable(symmetric=True)
+        player = game_agent.AlphaBetaPlayer(transposition_table=table)
+        player.time_left = lambda: 1000.
+        self.game.apply_move((3, 3))
+        for depth in range(1, 4):
+            self.assertEqual(plain._search_root(self.game, depth)[0],
+                             player._search_root(self.game, depth)[0])
+        self.assertGreater(table.hits, 0)
+
+    def test_OpeningBook_lookup(self):
+        import opening_book
+        self.keep_random_state()
+        self.setUp()
+        book = opening_book.build_book(plies=3, depth=2, width=5, height=5)
+        self.assertEqual(len(book.positions), 1 + 6 + 85)
+        for first, second in [((0, 1), (2, 2)), ((1, 0), (2, 2)), ((4, 3), (2, 2))]:
+            game = isolation.Board(self.player1, self.player2, width=5, height=5)
+            game.apply_move(first)
+            game.apply_move(second)
+            self.assertIn(book.lookup(game), game.get_legal_moves())
+        self.assertIsNone(book.lookup(self.game))
+        self.assertEqual(book.hits, 3)
+
+        mirrored = isolation.Board(self.player1, self.player2, width=5, height=5)
+        mirrored.apply_move((4, 1))
+        mirrored.apply_move((2, 2))
+        row, col = book.lookup(game)
+        self.assertEqual(book.lookup(mirrored), (row, 4 - col))
+        player = game_agent.AlphaBetaPlayer(book=book)
+        self.assertEqual(player.get_move(game, lambda: 0.), (row, col))
+
+    def test_random_playouts(self):
+        from isolation.playouts import random_playouts
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((4, 4))
+        cornered = isolation.Board(self.player1, self.player2, width=3, height=3)
+        for move in [(1, 1), (0, 0)]:
+            cornered.apply_move(move)
+        wins = random_playouts([self.game, self.game.forecast_move((0, 0))],
+                               playouts=500, seed=1)
+        self.assertEqual(wins.shape, (2,))
+        self.assertTrue(100 < wins[0] < 400)
+        self.assertEqual(random_playouts([cornered], seed=1)[0], 0)
+        self.assertEqual(self.game.get_player_location(self.player1), (2, 1))
+        self.assertRaises(ValueError, random_playouts, [self.game, cornered])
+
     def test_L_shaped_moves(self):
         self.setUp()
         self.game.apply_move((0,0))
@@ -79,6 +611,47 @@ class IsolationTest(unittest.TestCase):
         self.assertIsNotNone(player1_custom_score)
         self.assertIsInstance(player1_custom_score, float)
 
+    def test_board_copy_is_independent(self):
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((3, 3))
+        branch = self.game.forecast_move((0, 0))
+        self.assertEqual(branch.get_player_location(self.player1), (0, 0))
+        self.assertEqual(self.game.get_player_location(self.player1), (2, 1))
+        self.assertIn((0, 0), self.game.get_blank_spaces())
+        self.assertNotIn((0, 0), branch.get_blank_spaces())
+        self.assertNotEqual(self.game.hash(), branch.hash())
+
+    def test_push_pop_restores_board(self):
+        self.keep_random_state()
+        self.setUp()
+        self.game.apply_move((2, 1))
+        self.game.apply_move((3, 3))
+        before = (self.game.to_string(), self.game.hash(), self.game.move_count)
+        for move in self.game.get_legal_moves():
+            self.game.push(move)
+            self.game.push(self.game.get_legal_moves()[0])
+            self.game.pop()
+            self.game.pop()
+            self.assertEqual(before, (self.game.to_string(), self.game.hash(),
+                                      self.game.move_count))
+        self.assertEqual(self.game.active_player, self.player1)
+        self.assertRaises(RuntimeError, self.game.pop)
+
+    def test_hash_matches_transpositions(self):
+        self.keep_random_state()
+        self.setUp()
+        other = isolation.Board(self.player1, self.player2)
+        for move in [(2, 2), (2, 4), (0, 3), (4, 3)]:
+            self.game.apply_move(move)
+        for move in [(2, 4), (2, 2), (0, 3), (4, 3)]:
+            other.push(move)
+        self.assertEqual(self.game.hash(), other.hash())
+        other.pop()
+        other.push((4, 1))
+        self.assertNotEqual(self.game.hash(), other.hash())
+
 
 
 if __name__ == '__main__':
@@ -0,0 +1,233 @@
+"""Time the board operations, the heuristics and fixed-depth searches on
+fixed corpora of positions, and compare the results against a baseline.
+
+The corpora are drawn from seeded random games, so every run measures the
+same positions: "opening" positions have 2 to 5 moves played, "middlegame"
+positions 10 to 19 and "endgame" positions 24 or more. Each board operation
+and score function is timed over a whole corpus (the best of several
+repeats, reported in microseconds per call), and each search is reported in
+nodes per second.
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --output new.json --compare baseline.json
+
+In compare mode, every benchmark slower than the baseline by more than the
+threshold is reported as a regression, and the script exits with status 1.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+
+from isolation import Board
+from sample_players import open_move_score, improved_score, center_score
+from game_agent import (MinimaxPlayer, AlphaBetaPlayer,
+                        custom_score, custom_score_2, custom_score_3)
+from search_stats import SearchStats
+
+PHASES = {"opening": (2, 6), "middlegame": (10, 20), "endgame": (24, 49)}
+
+SCORE_FUNCTIONS = [open_move_score, improved_score, center_score,
+                   custom_score, custom_score_2, custom_score_3]
+
+SEARCH_DEPTHS = {"minimax": 3, "alphabeta": 5}
+
+
+def position_corpus(phase, size=50, seed=0):
+    """Return `size` positions of a game phase sampled from random games.
+
+    Parameters
+    ----------
+    phase : str
+        One of the keys of `PHASES`.
+
+    size : int (optional)
+        The number of positions.
+
+    seed : int (optional)
+        Seed of the random games; the same seed always gives the same corpus.
+
+    Returns
+    -------
+    list<isolation.Board>
+    """
+    low, high = PHASES[phase]
+    rng = random.Random("{}:{}".format(phase, seed))
+    corpus = []
+    while len(corpus) < size:
+        game = Board("player_1", "player_2")
+        target = rng.randrange(low, high)
+        while game.move_count < target:
+            # Sorted, so the corpus does not depend on the move order
+            moves = sorted(game.get_legal_moves())
+            if not moves:
+                break
+            game.apply_move(rng.choice(moves))
+        # Positions that ended before the target are drawn again
+        if game.move_count == target and game.get_legal_moves():
+            corpus.append(game)
+    return corpus
+
+
+def push_pop(game, move):
+    """Apply a move in place and revert it, leaving the position unchanged
+    so that it can be timed repeatedly on the same corpus.
+    """
+    game.push(move)
+    game.pop()
+
+
+def time_calls(fn, args, repeat=5):
+    """Return the best time (in microseconds) per call of `fn` over the
+    argument tuples `args`, out of `repeat` runs of the whole list.
+    """
+    number = max(1, 2000 // len(args))
+
+    def run():
+        for _ in range(number):
+            for a in args:
+                fn(*a)
+
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return 1e6 * best / (number * len(args))
+
+
+def time_search(kind, depth, corpus, repeat=3):
+    """Return the nodes per second of fixed-depth searches of the corpus.
+
+    The nodes are counted once on an instrumented copy of each position
+    (see `SearchStats`) and the searches are timed on the plain positions.
+    The corpus boards do not shuffle their moves, so both runs visit the
+    same tree.
+    """
+    player = MinimaxPlayer() if kind == "minimax" else AlphaBetaPlayer()
+    player.time_left = lambda: float("inf")
+    search = getattr(player, kind)
+    nodes = 0
+    for game in corpus:
+        stats = SearchStats()
+        search(stats.start_move(game), depth)
+        nodes += stats.pushes + 1
+
+    def run():
+        for game in corpus:
+            search(game, depth)
+
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return nodes / best
+
+
+def run_benchmarks(size=50, seed=0, repeat=5, progress=None):
+    """Run every benchmark and return a dict of the results.
+
+    Board operations and score functions are keyed "<operation>/<phase>"
+    with a "us_per_call" entry, and searches "<search>/d<depth>/<phase>"
+    with a "nodes_per_second" entry.
+    """
+    results = {}
+    for phase in PHASES:
+        corpus = position_corpus(phase, size, seed)
+        moves = [(game, min(game.get_legal_moves())) for game in corpus]
+        games = [(game,) for game in corpus]
+        board_ops = [
+            ("copy", Board.copy, games),
+            ("forecast_move", Board.forecast_move, moves),
+            ("get_legal_moves", Board.get_legal_moves, games),
+            ("push_pop", push_pop, moves),
+            ("hash", Board.hash, games),
+        ]
+        for name, fn, args in board_ops:
+            results["{}/{}".format(name, phase)] = {"us_per_call": time_calls(fn, args, repeat)}
+            if progress is not None:
+                progress(name, phase)
+        # Score from the perspective of player_1 in every position
+        scored = [(game, "player_1") for game in corpus]
+        for fn in SCORE_FUNCTIONS:
+            results["{}/{}".format(fn.__name__, phase)] = {
+                "us_per_call": time_calls(fn, scored, repeat)}
+            if progress is not None:
+                progress(fn.__name__, phase)
+        for kind, depth in SEARCH_DEPTHS.items():
+            name = "{}/d{}".format(kind, depth)
+            searched = corpus[:max(1, size // 5)]
+            results["{}/{}".format(name, phase)] = {
+                "nodes_per_second": time_search(kind, depth, searched, max(1, repeat // 2))}
+            if progress is not None:
+                progress(name, phase)
+    return results
+
+
+def compare(results, baseline, threshold=0.1):
+    """Return the (name, baseline, new, change) of every benchmark that
+    regressed by more than `threshold` (as a fraction) against the baseline.
+    Benchmarks missing from either side are ignored.
+    """
+    regressions = []
+    for name, new in sorted(results.items()):
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if "us_per_call" in new and "us_per_call" in old:
+            change = new["us_per_call"] / old["us_per_call"] - 1
+            old_value, new_value = old["us_per_call"], new["us_per_call"]
+        elif "nodes_per_second" in new and "nodes_per_second" in old:
+            change = old["nodes_per_second"] / new["nodes_per_second"] - 1
+            old_value, new_value = old["nodes_per_second"], new["nodes_per_second"]
+        else:
+            continue
+        if change > threshold:
+            regressions.append((name, old_value, new_value, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the board operations, " +
+                                     "heuristics and searches of the Isolation agents.")
+    parser.add_argument("-o", "--output", default=None,
+                        help="path of the JSON results")
+    parser.add_argument("-c", "--compare", metavar="BASELINE", default=None,
+                        help="JSON results to compare against")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1,
+                        help="slowdown (as a fraction) reported as a regression")
+    parser.add_argument("-n", "--size", type=int, default=50,
+                        help="number of positions of each corpus")
+    parser.add_argument("-r", "--repeat", type=int, default=5,
+                        help="number of timed runs of each benchmark (the best is kept)")
+    parser.add_argument("-s", "--seed", type=int, default=0,
+                        help="seed of the position corpora")
+    args = parser.parse_args()
+
+    def progress(name, phase):
+        print("{:<24}{}".format(name, phase), file=sys.stderr)
+
+    results = run_benchmarks(args.size, args.seed, args.repeat, progress=progress)
+    for name, result in sorted(results.items()):
+        if "us_per_call" in result:
+            print("{:<40}{:>12.2f} us/call".format(name, result["us_per_call"]))
+        else:
+            print("{:<40}{:>12.0f} nodes/s".format(name, result["nodes_per_second"]))
+
+    if args.output is not None:
+        data = {"python": platform.python_version(), "size": args.size,
+                "seed": args.seed, "results": results}
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if (baseline["size"], baseline["seed"]) != (args.size, args.seed):
+            print("Warning: the baseline was measured on different corpora")
+        regressions = compare(results, baseline["results"], args.threshold)
+        for name, old, new, change in regressions:
+            print("REGRESSION {:<40}{:>12.2f} -> {:.2f} ({:+.0%})".format(
+                name, old, new, change))
+        if regressions:
+            sys.exit(1)
+        print("No regression beyond {:.0%}".format(args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ champions) in a tournament.
 
          COMPLETING AND SUBMITTING A COMPETITION AGENT IS OPTIONAL
 """
+import math
 import random
 
 
@@ -36,6 +37,48 @@ def custom_score(game, player):
     raise NotImplementedError
 
 
+class MCTSNode:
+    """A node of the Monte Carlo search tree, i.e., the position reached by
+    playing `move` from the parent node.
+
+    Nodes only reference their children, so a discarded subtree holds no
+    reference cycle and is freed as soon as it is dropped.
+
+    Attributes
+    ----------
+    key : int
+        The hash of the board position of the node.
+
+    mover : int
+        The parity of the player who made `move` (0 for player 1, 1 for
+        player 2); the statistics of the node are from that player's point
+        of view.
+
+    untried : list<(int, int)>
+        The legal moves of the position that have no child node yet.
+
+    visits, wins : int
+        The number of playouts through the node, and how many of them were
+        won by the player who made `move`.
+    """
+    __slots__ = ("move", "key", "mover", "children", "untried", "visits", "wins")
+
+    def __init__(self, game, move=None):
+        self.move = move
+        self.key = game.hash()
+        self.mover = (game.move_count - 1) & 1
+        self.children = []
+        self.untried = game.get_legal_moves()
+        self.visits = 0
+        self.wins = 0
+
+    def select_child(self, exploration):
+        """Return the child with the highest UCB1 (UCT) value."""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda c: c.wins / c.visits +
+                   exploration * math.sqrt(log_visits / c.visits))
+
+
 class CustomPlayer:
     """Game-playing agent to use in the optional player vs player Isolation
     competition.
@@ -59,12 +102,40 @@ class CustomPlayer:
         the PvP competition uses more accurate timers that are not cross-
         platform compatible, so a limit of 1ms (vs 10ms for the other classes)
         is generally sufficient.
+
+    exploration : float (optional)
+        The exploration constant of the UCT selection rule.
+
+    widening : (float, float) (optional)
+        Progressive widening parameters (k, a): a node visited n times may
+        have at most ceil(k * n^a) children. If None, every node is fully
+        expanded before its children are selected.
+
+    reuse_tree : bool (optional)
+        Whether to keep the subtree of the position reached after the
+        opponent's reply between turns.
+
+    Attributes
+    ----------
+    playouts : int
+        The number of playouts run during the last call to `get_move()`.
+
+    playouts_per_second : float
+        The playout throughput of the last call to `get_move()`.
     """
 
-    def __init__(self, data=None, timeout=1.):
+    def __init__(self, data=None, timeout=1., exploration=math.sqrt(2), widening=None,
+                 reuse_tree=True):
         self.score = custom_score
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.exploration = exploration
+        self.widening = widening
+        self.reuse_tree = reuse_tree
+        self.playouts = 0
+        self.playouts_per_second = 0.
+        self._root = None
+        self._tree = None
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -93,5 +164,79 @@ class CustomPlayer:
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        # OPTIONAL: Finish this function!
-        raise NotImplementedError
+        self.time_left = time_left
+        start = time_left()
+        root = self._find_root(game)
+        if not root.untried and not root.children:
+            return (-1, -1)
+
+        # Playouts are made in place on a single copy of the board
+        board = game.copy()
+        self.playouts = 0
+        while time_left() > self.TIMER_THRESHOLD:
+            self._playout(root, board)
+            self.playouts += 1
+        elapsed = (start - time_left()) / 1000
+        self.playouts_per_second = self.playouts / elapsed if elapsed > 0 else 0.
+
+        if not root.children:
+            return root.untried[0]
+        best = max(root.children, key=lambda c: c.visits)
+        # The whole tree is kept until the next call, which frees the
+        # siblings of `best` before its own playouts start
+        self._tree, self._root = root, best
+        return best.move
+
+    def _find_root(self, game):
+        """Return the node of the current position, reusing the subtree of
+        the previous search if the position was reached from its root.
+        """
+        key = game.hash()
+        root = None
+        if self.reuse_tree and self._root is not None:
+            root = next((child for child in [self._root] + self._root.children
+                         if child.key == key), None)
+        self._tree = self._root = None
+        return root if root is not None else MCTSNode(game)
+
+    def _expandable(self, node):
+        """Test whether a child should be added to the node."""
+        if not node.untried:
+            return False
+        if self.widening is None or not node.children:
+            return True
+        k, a = self.widening
+        return len(node.children) < math.ceil(k * (node.visits + 1) ** a)
+
+    def _playout(self, root, board):
+        """Run one iteration of UCT from the root: select and expand a node,
+        play random moves until the game ends, record the result along the
+        path, and undo all moves applied to the board.
+        """
+        node = root
+        path = [root]
+        while not self._expandable(node) and node.children:
+            node = node.select_child(self.exploration)
+            board.push(node.move)
+            path.append(node)
+        if self._expandable(node):
+            move = node.untried.pop(random.randrange(len(node.untried)))
+            board.push(move)
+            child = MCTSNode(board, move)
+            node.children.append(child)
+            path.append(child)
+        pushed = len(path) - 1
+
+        # Random playout; the player left without legal moves loses
+        moves = board.get_legal_moves()
+        while moves:
+            board.push(random.choice(moves))
+            pushed += 1
+            moves = board.get_legal_moves()
+        winner = (board.move_count - 1) & 1
+        for _ in range(pushed):
+            board.pop()
+
+        for node in path:
+            node.visits += 1
+            node.wins += node.mover == winner
@@ -5,6 +5,8 @@ and include the results in your report.
 import random
 import math
 
+from collections import OrderedDict
+
 
 NEGATIVE_INFINITY = float("-inf")
 POSITIVE_INFINITY = float("inf")
@@ -30,24 +32,21 @@ def L_shaped_moves(game, player):
     return list(set(valid_moves))
 
 
+def move_lookahead_mask(game, player, loc=None):
+    """Return the bitmask of blank cells the player could reach in his next
+    two turns assuming the opponent doesn't move, read from the board's
+    precomputed two-step knight tables.
+    """
+    r, c = loc or game.get_player_location(player)
+    two_steps = game.knight_tables.two_step_masks[r + c * game.height]
+    return two_steps & game.get_blank_mask()
+
+
 def move_lookahead(game, player, loc=None):
     """Generate the list of possible moves for the player in his next turn
     assuming the opponent doesn't move.
     """
-    loc = loc or game.get_player_location(player)
-
-    # Obtain future moves based on each currently possible move.
-    directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                  (1, -2), (1, 2), (2, -1), (2, 1)]
-    directions = set(((cr + fr, cf + fc)
-                      for fr, fc in directions    # future
-                      for cr, cf in directions))  # current
-
-    # Filter out invalid moves.
-    r, c = loc
-    valid_moves = [(r + dr, c + dc) for dr, dc in directions
-                   if game.move_is_legal((r + dr, c + dc))]
-    return set(valid_moves)
+    return set(game.knight_tables.cells(move_lookahead_mask(game, player, loc)))
 
 
 def move_lookahead_counter(game, player):
@@ -55,16 +54,12 @@ def move_lookahead_counter(game, player):
     after removing each move that could be prevented by the player before.
     """
     # obtain our moves
-    own_moves = set(game.get_legal_moves(player))
+    own_moves = game.get_legal_move_mask(player)
     # obtain the opponent's move, but removing all moves we could counter
-    opp_moves = set(game.get_legal_moves(game.get_opponent(player))) - own_moves
-    # project our moves, but remove everything the opponent could counter
-    own_moves = set((m for m in move_lookahead(game, None, loc=loc))
-                    for loc in own_moves) - opp_moves
-    # repeat for the opponent
-    opp_moves = set((m for m in move_lookahead(game, None, loc=loc))
-                    for loc in opp_moves) - own_moves
-    return len(opp_moves)
+    opp_moves = game.get_legal_move_mask(game.get_opponent(player)) & ~own_moves
+    # the projections of both sides two turns ahead remove nothing more (one
+    # entry per move remains), so the count is that of the opponent's moves
+    return bin(opp_moves).count("1")
 
 
 def move_branches(game):
@@ -110,15 +105,15 @@ def custom_score(game, player):
     float
         The heuristic value of the current game state to the specified player.
     """
-    own_moves = len(game.get_legal_moves(player))
+    own_moves = game.count_legal_moves(player)
     if own_moves == 0:
         return NEGATIVE_INFINITY
 
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    opp_moves = game.count_legal_moves(game.get_opponent(player))
     if opp_moves == 0:
         return POSITIVE_INFINITY
 
-    opp_future_moves = len(move_lookahead(game, game.get_opponent(player)))
+    opp_future_moves = bin(move_lookahead_mask(game, game.get_opponent(player))).count("1")
 
 
     return float(own_moves - 2 * opp_future_moves)
@@ -146,11 +141,11 @@ def custom_score_2(game, player):
     float
         The heuristic value of the current game state to the specified player.
     """
-    own_moves = len(game.get_legal_moves(player))
+    own_moves = game.count_legal_moves(player)
     if own_moves == 0:
         return NEGATIVE_INFINITY
 
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    opp_moves = game.count_legal_moves(game.get_opponent(player))
     if opp_moves == 0:
         return POSITIVE_INFINITY
 
@@ -187,11 +182,11 @@ def custom_score_3(game, player):
     float
         The heuristic value of the current game state to the specified player.
     """
-    own_moves = len(game.get_legal_moves(player))
+    own_moves = game.count_legal_moves(player)
     if own_moves == 0:
         return NEGATIVE_INFINITY
 
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    opp_moves = game.count_legal_moves(game.get_opponent(player))
     if opp_moves == 0:
         return POSITIVE_INFINITY
 
@@ -208,6 +203,385 @@ def custom_score_3(game, player):
                  - weighted_dist)
 
 
+# Bound types of the values stored in a TranspositionTable
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+# XOR-ed into the board hash for nodes where the searching player is not
+# the one to move, so that the root-perspective values of both kinds of
+# nodes are stored under distinct keys.
+MIN_NODE_KEY = 0x5bd1e9955bd1e995
+
+# Width of the null windows used by principal variation search; scores are
+# floats, so any positive width separates "better than alpha" from "not".
+NULL_WINDOW = 1e-6
+
+# With an automatic check interval, the clock is polled often enough that
+# at most this fraction of the timeout threshold elapses between two polls.
+AUTO_CHECK_FRACTION = 0.25
+
+
+class TranspositionTable:
+    """Fixed-capacity cache of search results keyed by the board hash.
+
+    Each entry records the search depth, the value found, the bound type of
+    that value (EXACT, LOWER_BOUND or UPPER_BOUND) and the best move. The
+    table is meant to live as long as the player that owns it, so results
+    carry over between iterations and between turns; call `new_search()` at
+    the start of every move so that entries left over from earlier turns are
+    the first to be replaced.
+
+    Parameters
+    ----------
+    capacity : int (optional)
+        The maximum number of entries held by the table; at least 2 with
+        the "two-tier" scheme (one bucket of two entries), and at least 1
+        otherwise.
+
+    replacement : str (optional)
+        The replacement scheme used when two positions map to the same slot:
+        "depth" keeps the entry searched to the greater depth, "always"
+        keeps the newest entry, and "two-tier" keeps both a depth-preferred
+        and an always-replace entry in each bucket.
+
+    symmetric : bool (optional)
+        If True, positions are keyed by their canonical hash so that the
+        symmetric images of a position share one entry, and moves are
+        stored on the canonical board (see `Board.canonical_form()`). The
+        score function must then be invariant under the board symmetries.
+
+    Attributes
+    ----------
+    hits, misses : int
+        The number of probes that found (or did not find) their position.
+
+    collisions : int
+        The number of missed probes whose slot was held by another position.
+    """
+    REPLACEMENT_SCHEMES = ("depth", "always", "two-tier")
+
+    def __init__(self, capacity=2**16, replacement="depth", symmetric=False):
+        if replacement not in self.REPLACEMENT_SCHEMES:
+            raise ValueError("`replacement` must be one of {}.".format(
+                self.REPLACEMENT_SCHEMES))
+        min_capacity = 2 if replacement == "two-tier" else 1
+        if capacity < min_capacity:
+            raise ValueError("`capacity` must be at least {} with the {!r} scheme.".format(
+                min_capacity, replacement))
+        self.capacity = capacity
+        self.replacement = replacement
+        self.symmetric = symmetric
+        self.clear()
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        self._buckets = self.capacity // 2 if self.replacement == "two-tier" else self.capacity
+        self._slots = [None] * self.capacity
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+    def new_search(self):
+        """Mark the entries stored so far as belonging to an earlier search."""
+        self._generation += 1
+
+    @property
+    def hit_rate(self):
+        """The fraction of probes that found their position."""
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.
+
+    def position_key(self, game):
+        """Return the hash key of the position and the index of the board
+        symmetry that maps the moves of the position onto the moves of its
+        entry (always 0, the identity, unless the table is symmetric).
+        """
+        if self.symmetric:
+            return game.canonical_form()
+        return game.hash(), 0
+
+    def probe(self, key):
+        """Return the entry (key, depth, value, bound, move) stored for the
+        hash key, or None if the table holds no entry for it.
+        """
+        idx = key % self._buckets
+        if self.replacement == "two-tier":
+            idx *= 2
+            entry = self._slots[idx]
+            if entry is None or entry[0] != key:
+                entry = self._slots[idx + 1]
+        else:
+            entry = self._slots[idx]
+
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        if entry is not None:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, value, bound, move):
+        """Record a search result for the hash key according to the
+        replacement scheme of the table.
+        """
+        entry = (key, depth, value, bound, move, self._generation)
+        idx = key % self._buckets
+        if self.replacement == "always":
+            self._slots[idx] = entry
+            return
+
+        if self.replacement == "two-tier":
+            idx *= 2
+            if not self._prefers(self._slots[idx], entry):
+                # Too shallow for the depth-preferred tier of the bucket
+                self._slots[idx + 1] = entry
+                return
+        elif not self._prefers(self._slots[idx], entry):
+            return
+        self._slots[idx] = entry
+
+    def _prefers(self, old, new):
+        """Test whether the new entry should replace the old one in a
+        depth-preferred slot.
+        """
+        return (old is None or old[0] == new[0] or old[5] != self._generation or
+                new[1] >= old[1])
+
+
+def onward_moves(game, move):
+    """Cheap static move score: the number of blank cells a knight could
+    move to from the destination of the move.
+    """
+    idx = move[0] + move[1] * game.height
+    return bin(game.knight_tables.move_masks[idx] & game.get_blank_mask()).count("1")
+
+
+class MoveOrdering:
+    """Order the moves searched by `AlphaBetaPlayer` so that the moves most
+    likely to cause a cutoff are searched first.
+
+    Moves are tried in the following order: the hash move (the best move
+    stored for the position by the transposition table, or else the best
+    move found for it by the previous iteration of this search), then the
+    killer moves of the ply, and then the remaining moves sorted by a
+    history table indexed by destination cell (or by a static score).
+
+    Parameters
+    ----------
+    killers : int (optional)
+        The number of killer moves remembered for each ply (0 disables
+        killer moves).
+
+    history : bool (optional)
+        Whether to sort the remaining moves by the history heuristic.
+
+    static_score : callable (optional)
+        A cheap function `static_score(game, move)` used to sort the
+        remaining moves (e.g., `onward_moves`); the history heuristic only
+        breaks ties when it is given.
+    """
+    def __init__(self, killers=2, history=True, static_score=None):
+        self.killers = killers
+        self.history = history
+        self.static_score = static_score
+        self._history = []
+        self._killers = {}
+        self._best_moves = {}
+
+    def new_search(self):
+        """Prepare for the search of a new move: forget the killer and best
+        moves, and age the history table so recent cutoffs dominate.
+        """
+        self._killers = {}
+        self._best_moves = {}
+        self._history = [h // 2 for h in self._history]
+
+    def order(self, game, moves, hash_move=None):
+        """Return the list of legal moves sorted in the order they should be
+        searched.
+        """
+        if len(moves) < 2:
+            return moves
+        if hash_move is None:
+            hash_move = self._best_moves.get(game.hash())
+        first = [hash_move] if hash_move in moves else []
+        first += [m for m in self._killers.get(game.move_count, ()) if m in moves and m not in first]
+
+        rest = [m for m in moves if m not in first]
+        if self.history or self.static_score:
+            history = self._history_table(game)
+            height = game.height
+            static_score = self.static_score
+
+            def priority(m):
+                value = history[m[0] + m[1] * height] if self.history else 0
+                if static_score is not None:
+                    return static_score(game, m), value
+                return value
+            rest.sort(key=priority, reverse=True)
+        return first + rest
+
+    def record_best(self, game, move):
+        """Remember the best move found for the current position."""
+        if move is not None:
+            self._best_moves[game.hash()] = move
+
+    def record_cutoff(self, game, move, depth):
+        """Update the killer moves of the ply and the history table for a
+        move that caused a cutoff when searched to the given depth.
+        """
+        if self.killers:
+            killers = self._killers.setdefault(game.move_count, [])
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[self.killers:]
+        if self.history:
+            self._history_table(game)[move[0] + move[1] * game.height] += depth * depth
+
+    def _history_table(self, game):
+        """Return the history table, sized for the board geometry."""
+        if len(self._history) != game.width * game.height:
+            self._history = [0] * (game.width * game.height)
+        return self._history
+
+
+class TimeManager:
+    """Decide how many iterations of iterative deepening to start for a move.
+
+    The cost of the next iteration is predicted from the effective branching
+    factor (EBF) of the iterations timed so far, i.e., the ratio between
+    the durations of the last two iterations, and an iteration is only
+    started if it is predicted to finish within the budget of the move. The
+    budget is the time left before the search timeout, reduced in the
+    opening where deeper searches pay off the least.
+
+    Parameters
+    ----------
+    default_ebf : float (optional)
+        The branching factor assumed until two iterations have been timed.
+
+    max_ebf : float (optional)
+        The largest branching factor used to predict an iteration.
+
+    safety : float (optional)
+        A factor applied to the predicted duration of the next iteration.
+
+    opening_blanks : float (optional)
+        The fraction of blank cells above which a position is considered
+        to be in the opening.
+
+    opening_factor : float (optional)
+        The fraction of the available time budgeted for opening moves.
+
+    Attributes
+    ----------
+    budget : float
+        The number of milliseconds budgeted for the current move.
+
+    ebf : float
+        The effective branching factor of the last two iterations.
+    """
+    def __init__(self, default_ebf=4., max_ebf=8., safety=1., opening_blanks=0.9,
+                 opening_factor=0.5):
+        self.default_ebf = default_ebf
+        self.max_ebf = max_ebf
+        self.safety = safety
+        self.opening_blanks = opening_blanks
+        self.opening_factor = opening_factor
+        self.budget = 0.
+        self.ebf = default_ebf
+        self._blanks = 0
+        self._durations = []
+
+    def start(self, game, available):
+        """Set the budget for a new move given the number of milliseconds
+        available before the search timeout.
+        """
+        self._blanks = bin(game.get_blank_mask()).count("1")
+        if self._blanks >= self.opening_blanks * game.width * game.height:
+            available *= self.opening_factor
+        self.budget = available
+        self.ebf = self.default_ebf
+        self._durations = []
+
+    def record(self, duration):
+        """Record the duration (in milliseconds) of a finished iteration."""
+        self._durations.append(max(duration, 1e-3))
+        if len(self._durations) > 1:
+            ebf = self._durations[-1] / self._durations[-2]
+            self.ebf = min(max(ebf, 1.), self.max_ebf)
+
+    def should_start(self, depth, spent):
+        """Test whether the iteration searching to the given depth should be
+        started, after `spent` milliseconds of the move have elapsed.
+        """
+        if depth > self._blanks:
+            # Every line of play already ended inside the previous iteration
+            return False
+        if not self._durations:
+            return True
+        predicted = self._durations[-1] * self.ebf * self.safety
+        return spent + predicted <= self.budget
+
+
+class EvaluationCache:
+    """Least-recently-used cache of the values of a score function, keyed
+    by the board hash and by whether the scored player is the one to move.
+    An instance is called like the score function it wraps.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The score function to cache; it must depend only on the position
+        and on the scored player.
+
+    capacity : int (optional)
+        The maximum number of cached values; the least recently used value
+        is evicted when the cache is full.
+
+    Attributes
+    ----------
+    hits, misses : int
+        The number of evaluations answered from the cache or computed,
+        respectively.
+    """
+
+    def __init__(self, score_fn, capacity=2**16):
+        self.score_fn = score_fn
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        """Remove all cached values and reset the counters."""
+        self._values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """The fraction of evaluations answered from the cache."""
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.
+
+    def __call__(self, game, player):
+        key = game.hash()
+        if player != game.active_player:
+            key ^= MIN_NODE_KEY
+        values = self._values
+        value = values.get(key)
+        if value is not None:
+            self.hits += 1
+            values.move_to_end(key)
+            return value
+        self.misses += 1
+        value = self.score_fn(game, player)
+        values[key] = value
+        if len(values) > self.capacity:
+            values.popitem(last=False)
+        return value
+
+
 class IsolationPlayer:
     """Base class for minimax and alphabeta agents -- this class is never
     constructed or tested directly.
@@ -229,12 +603,97 @@ class IsolationPlayer:
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    check_interval : int or str (optional)
+        The number of search nodes visited between two calls to `time_left`.
+        If "auto", the interval is tuned from the node throughput measured
+        between polls so that about AUTO_CHECK_FRACTION of the timeout
+        threshold elapses between them.
+
+    evaluation_cache : int (optional)
+        If given, `score_fn` is wrapped in an `EvaluationCache` holding up
+        to this many values, so that positions scored again (e.g., by the
+        next iteration of iterative deepening) are not evaluated twice.
+
+    stats : search_stats.SearchStats (optional)
+        If given, the search of every move is instrumented and recorded
+        (see search_stats.py). If None (the default) nothing is recorded.
+
+    node_limit : int (optional)
+        If given, the search of each move stops after this many nodes
+        instead of on the clock, which is never polled, so the moves and
+        node counts of a search do not depend on timer jitter (as long as
+        the move order is seeded, see `isolation.Board`). Nodes are counted
+        at the polls of the search, i.e., in steps of `check_interval`
+        nodes ("auto" polls every node). If None (the default) the search
+        stops when `time_left()` falls below `timeout`.
+
+    Attributes
+    ----------
+    nodes_searched : int
+        The number of nodes searched for the current (or last) move, as
+        counted at the last poll of the search.
     """
-    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.):
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.,
+                 check_interval=1, evaluation_cache=None, stats=None, node_limit=None):
         self.search_depth = search_depth
+        if evaluation_cache is not None:
+            score_fn = EvaluationCache(score_fn, evaluation_cache)
+        if stats is not None:
+            score_fn = stats.timed_score(score_fn)
+        self.stats = stats
         self.score = score_fn
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.check_interval = check_interval
+        self.node_limit = node_limit
+        self.nodes_searched = 0
+        self._check_countdown = 0
+        self._check_every = 1 if check_interval == "auto" else check_interval
+        self._last_poll = None
+        self._last_interval = 1
+
+    def _start_clock(self, time_left):
+        """Start timing a new move; the clock is polled at the next node."""
+        self.time_left = time_left
+        self.nodes_searched = 0
+        self._check_countdown = 0
+        self._last_poll = None
+        self._last_interval = 1
+
+    def _count_node(self):
+        """Count a node searched outside the search functions (e.g., by the
+        endgame solver) and poll the clock when it is due.
+        """
+        self._check_countdown -= 1
+        if self._check_countdown <= 0:
+            self._check_time()
+
+    def _check_time(self):
+        """Poll the clock (or the node budget), raising SearchTimeout if the
+        search must stop, and schedule the next poll.
+        """
+        self.nodes_searched += self._last_interval
+        if self.node_limit is not None:
+            if self.nodes_searched > self.node_limit:
+                raise SearchTimeout()
+            self._check_countdown = self._last_interval = self._check_every
+            return
+        remaining = self.time_left()
+        if remaining < self.TIMER_THRESHOLD:
+            raise SearchTimeout()
+        if self.check_interval == "auto":
+            if self._last_poll is not None:
+                elapsed = self._last_poll - remaining
+                if elapsed > 0:
+                    nodes_per_ms = self._check_every / elapsed
+                    self._check_every = max(1, int(
+                        nodes_per_ms * self.TIMER_THRESHOLD * AUTO_CHECK_FRACTION))
+                else:
+                    # The clock did not advance; poll less often
+                    self._check_every *= 2
+            self._last_poll = remaining
+        self._check_countdown = self._last_interval = self._check_every
 
 
 class MinimaxPlayer(IsolationPlayer):
@@ -275,8 +734,8 @@ class MinimaxPlayer(IsolationPlayer):
 
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
-        self.time_left = time_left
-        best_move = (-1, -1)
+        self._start_clock(time_left)
+        best_move = next(game.iter_legal_moves(), (-1, -1))
 
         try:
             # The try/except block will automatically catch the exception
@@ -322,19 +781,29 @@ class MinimaxPlayer(IsolationPlayer):
                 testing.
         """
 
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
+        self._check_countdown -= 1
+        if self._check_countdown <= 0:
+            self._check_time()
 
+        # The active player has lost once it has no legal move left, so the
+        # moves generated for the expansion double as the terminal test.
         player = game.active_player
-        if depth == 0 or game.is_winner(player) or game.is_loser(player):
+        moves = game.get_legal_moves(player) if depth else None
+        if not moves:
             return self.score(game, player if maximizing_player else game.inactive_player), None
 
         # The infinities ensure that the first result always initializes the fields.
         best_value = 0
         best_move = None
 
-        for move, branch in move_branches(game):
-            v, m = self._minimax(branch, depth - 1, maximizing_player=not maximizing_player)
+        # Walk the tree in place: each move is pushed onto the single search
+        # board and popped again once its subtree has been searched.
+        for move in moves:
+            game.push(move)
+            try:
+                v, m = self._minimax(game, depth - 1, maximizing_player=not maximizing_player)
+            finally:
+                game.pop()
             if best_move is None:
                 best_value, best_move = v, move
             elif maximizing_player:
@@ -394,7 +863,90 @@ class AlphaBetaPlayer(IsolationPlayer):
     """Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning. You must finish and test this player to
     make sure it returns a good move before the search time limit expires.
+
+    Parameters
+    ----------
+    transposition_table : TranspositionTable (optional)
+        A table used to cache search results across iterations and turns.
+        If None (the default) every node is searched from scratch.
+
+    move_ordering : MoveOrdering (optional)
+        The policy used to sort the moves at each node. If None (the
+        default) moves are searched in the order `get_legal_moves` returns.
+
+    search : str (optional)
+        The search algorithm: "alphabeta" for minimax with alpha-beta
+        pruning, or "pvs" for principal variation search (NegaScout) in
+        negamax form.
+
+    aspiration_windows : sequence<float> (optional)
+        The growth schedule of the aspiration windows used by iterative
+        deepening. Each iteration after the first searches the window
+        (score - w, score + w) around the score of the previous iteration,
+        starting with the first width w of the schedule; each fail-low or
+        fail-high moves that side of the window out to the next width, and
+        to infinity once the schedule is exhausted. If None (the default)
+        every iteration searches the full window.
+
+    time_manager : TimeManager (optional)
+        The controller deciding whether to start each iteration of
+        iterative deepening. When given, the search also keeps a better
+        root move found by an interrupted iteration, as long as the move
+        it beat was the previous best move (which `MoveOrdering` searches
+        first). If None (the default) the search deepens until timeout.
+
+    endgame : isolation.endgame.EndgameSolver (optional)
+        The solver of partitioned positions. When given, a root position
+        it solves is answered with the first move of the longest path left
+        to the player, and solved positions inside the search return their
+        exact outcome instead of being searched. The solver polls the clock
+        like the search, and a root solve that runs out of time returns
+        the first legal move. If None (the default) partitioned positions
+        are searched like any other.
+
+    book : object (optional)
+        An opening book (e.g., `opening_book.OpeningBook`) whose method
+        `lookup(game)` returns the move to play in a position, or None.
+        Positions found in the book are answered without searching.
+
+    max_depth : int (optional)
+        If given, iterative deepening stops after the iteration of this
+        depth. Together with `node_limit` (see `IsolationPlayer`) it gives
+        a search budget that does not depend on the clock. If None (the
+        default) the search deepens until it runs out of time (or nodes).
+
+    Attributes
+    ----------
+    aspiration_stats : dict
+        Counters of the aspiration searches: the number of "searches" that
+        started with a narrow window, how many of them failed low
+        ("fail_low") or high ("fail_high") and had to be searched again,
+        and the initial "window" width of the most recent one.
     """
+    SEARCH_MODES = ("alphabeta", "pvs")
+
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.,
+                 check_interval=1, transposition_table=None, move_ordering=None,
+                 search="alphabeta", aspiration_windows=None, time_manager=None,
+                 endgame=None, book=None, evaluation_cache=None, stats=None,
+                 node_limit=None, max_depth=None):
+        super().__init__(search_depth=search_depth, score_fn=score_fn, timeout=timeout,
+                         check_interval=check_interval, evaluation_cache=evaluation_cache,
+                         stats=stats, node_limit=node_limit)
+        if search not in self.SEARCH_MODES:
+            raise ValueError("`search` must be one of {}.".format(self.SEARCH_MODES))
+        self.transposition_table = transposition_table
+        self.move_ordering = move_ordering
+        self.search = search
+        self.aspiration_windows = aspiration_windows
+        self.aspiration_stats = {"searches": 0, "fail_low": 0, "fail_high": 0, "window": None}
+        self.time_manager = time_manager
+        self.endgame = endgame
+        self.book = book
+        self.max_depth = max_depth
+        self._root_ply = -1
+        self._root_first = None
+        self._root_improved = None
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -426,22 +978,120 @@ class AlphaBetaPlayer(IsolationPlayer):
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        self.time_left = time_left
+        self._start_clock(time_left)
+        stats = self.stats
+        if stats is None:
+            return self._choose_move(game, time_left)
+        move = self._choose_move(stats.start_move(game), time_left)
+        stats.end_move(time_left())
+        return move
+
+    def _choose_move(self, game, time_left):
+        """Answer from the book or the endgame solver if they apply, and
+        search with iterative deepening otherwise.
+        """
+        if self.book is not None:
+            move = self.book.lookup(game)
+            if move is not None:
+                return move
+        if self.endgame is not None:
+            try:
+                solution = self.endgame.solve(game, self._count_node)
+            except SearchTimeout:
+                return next(game.iter_legal_moves(), (-1, -1))
+            if solution is not None:
+                return solution[2] or (-1, -1)
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+        if self.move_ordering is not None:
+            self.move_ordering.new_search()
+
+        tm = self.time_manager
+        if tm is not None:
+            move_start = time_left()
+            tm.start(game, move_start - self.TIMER_THRESHOLD)
 
         best_move = None
+        score = None
         try:
             depth = 0
-            while True:
+            while self.max_depth is None or depth < self.max_depth:
                 depth += 1
-                best_move = self.alphabeta(game, depth=depth)
+                if tm is not None:
+                    iteration_start = time_left()
+                    if not tm.should_start(depth, move_start - iteration_start):
+                        break
+                score, best_move = self._aspiration_search(game, depth, score)
+                if self.stats is not None:
+                    self.stats.record_iteration()
+                if tm is not None:
+                    tm.record(iteration_start - time_left())
         except SearchTimeout:
             # Handle any actions required at timeout, if necessary
-            pass
+            if (tm is not None and self._root_improved is not None and
+                    self._root_first == best_move):
+                # The interrupted iteration already found a move that beats
+                # the best move of the last completed iteration.
+                best_move = self._root_improved
 
             # Return the best move from the last completed search iteration
 
         return best_move or (-1, -1)
 
+    def _aspiration_search(self, game, depth, guess):
+        """Search the root to the given depth inside an aspiration window
+        around the score `guess` of the previous iteration, widening the
+        window and searching again whenever the score falls outside of it.
+
+        Returns
+        -------
+        (float, (int, int))
+            The score of the root and the best move found (or (-1, -1))
+        """
+        schedule = self.aspiration_windows
+        if not schedule or guess is None or guess in (NEGATIVE_INFINITY, POSITIVE_INFINITY):
+            return self._search_root(game, depth)
+
+        stats = self.aspiration_stats
+        stats["searches"] += 1
+        stats["window"] = 2 * schedule[0]
+        low = high = 0
+        alpha, beta = guess - schedule[0], guess + schedule[0]
+        while True:
+            value, move = self._search_root(game, depth, alpha, beta)
+            if value <= alpha and alpha > NEGATIVE_INFINITY:
+                stats["fail_low"] += 1
+                low += 1
+                alpha = guess - schedule[low] if low < len(schedule) else NEGATIVE_INFINITY
+            elif value >= beta and beta < POSITIVE_INFINITY:
+                stats["fail_high"] += 1
+                high += 1
+                beta = guess + schedule[high] if high < len(schedule) else POSITIVE_INFINITY
+            else:
+                return value, move
+
+    def _note_root_result(self, move, value, alpha):
+        """Track the root moves of the current iteration: the first move
+        searched, and the last move whose value beat all moves before it.
+        """
+        if self._root_first is None:
+            self._root_first = move
+        elif value > alpha:
+            self._root_improved = move
+
+    def _search_root(self, game, depth, alpha=NEGATIVE_INFINITY, beta=POSITIVE_INFINITY):
+        """Search the root with the selected search algorithm and return
+        its score for the root player and the best move (or (-1, -1)).
+        """
+        self._root_ply = game.move_count
+        self._root_first = None
+        self._root_improved = None
+        if self.search == "pvs":
+            value, best_move = self._pvs(game, depth, alpha, beta)
+        else:
+            value, best_move = self._alphabeta(game, depth, alpha, beta)
+        return value, best_move or (-1, -1)
+
     def _alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf"), maximizing_player: bool = True):
             """Implement depth-limited minimax search with alpha-beta pruning as
             described in the lectures.
@@ -478,28 +1128,77 @@ class AlphaBetaPlayer(IsolationPlayer):
                     each helper function or else your agent will timeout during
                     testing.
             """
-            if self.time_left() < self.TIMER_THRESHOLD:
-                raise SearchTimeout()
+            self._check_countdown -= 1
+            if self._check_countdown <= 0:
+                self._check_time()
+
+            if self.endgame is not None and game.move_count != self._root_ply:
+                wins = self.endgame.active_player_wins(game, self._count_node)
+                if wins is not None:
+                    return (POSITIVE_INFINITY if wins == maximizing_player
+                            else NEGATIVE_INFINITY), None
 
             player = game.active_player
-            if depth == 0 or game.is_winner(player) or game.is_loser(player):
+            if depth == 0:
+                return self.score(game, player if maximizing_player else game.inactive_player), None
+
+            hash_move = None
+            tt = self.transposition_table
+            if tt is not None:
+                key, sym = tt.position_key(game)
+                if not maximizing_player:
+                    key ^= MIN_NODE_KEY
+                entry = tt.probe(key)
+                if entry is not None:
+                    _, entry_depth, value, bound, hash_move, _ = entry
+                    if sym:
+                        hash_move = game.knight_tables.transform_move(hash_move, sym, inverse=True)
+                    # Reuse a result searched at least as deep if it is exact or
+                    # its bound already falls outside of the (alpha, beta) window.
+                    if entry_depth >= depth and (
+                            bound == EXACT or (bound == LOWER_BOUND and value >= beta) or
+                            (bound == UPPER_BOUND and value <= alpha)):
+                        return value, hash_move
+                alpha_orig, beta_orig = alpha, beta
+
+            # The active player has lost once it has no legal move left, so
+            # the moves generated for the expansion double as the terminal
+            # test (terminal positions are never stored in the table).
+            moves = game.get_legal_moves(player)
+            if not moves:
                 return self.score(game, player if maximizing_player else game.inactive_player), None
+            ordering = self.move_ordering
+            if ordering is not None:
+                moves = ordering.order(game, moves, hash_move)
 
             best_value = 0
             best_move = None
 
-            for move, branch in move_branches(game):
-                v, m = self._alphabeta(branch, depth - 1, alpha=alpha, beta=beta,
-                                       maximizing_player=not maximizing_player)
+            # Walk the tree in place: each move is pushed onto the single
+            # search board and popped again once its subtree has been searched.
+            for move in moves:
+                game.push(move)
+                try:
+                    v, m = self._alphabeta(game, depth - 1, alpha=alpha, beta=beta,
+                                           maximizing_player=not maximizing_player)
+                finally:
+                    game.pop()
                 if best_move is None:
                     best_value, best_move = v, move
 
+                if game.move_count == self._root_ply:
+                    self._note_root_result(move, v, alpha)
+
                 if maximizing_player:
                     # If the value is better, store it and the move that led to it.
                     if v > best_value:
                         best_value, best_move = v, move
                     alpha = max(alpha, v)  # raise the lower bound
                     if v >= beta:  # TODO: add explanatory comment
+                        if ordering is not None:
+                            ordering.record_cutoff(game, move, depth)
+                        if self.stats is not None:
+                            self.stats.record_cutoff(move == moves[0])
                         break
                 else:
                     # If the value is better, store it and the move that led to it.
@@ -507,10 +1206,142 @@ class AlphaBetaPlayer(IsolationPlayer):
                         best_value, best_move = v, move
                     beta = min(beta, v)  # lower the upper bound
                     if v <= alpha:  # TODO: add explanatory comment
+                        if ordering is not None:
+                            ordering.record_cutoff(game, move, depth)
+                        if self.stats is not None:
+                            self.stats.record_cutoff(move == moves[0])
                         break
 
+            if ordering is not None:
+                ordering.record_best(game, best_move)
+
+            if tt is not None:
+                if best_value <= alpha_orig:
+                    bound = UPPER_BOUND
+                elif best_value >= beta_orig:
+                    bound = LOWER_BOUND
+                else:
+                    bound = EXACT
+                stored_move = game.knight_tables.transform_move(best_move, sym) if sym else best_move
+                tt.store(key, depth, best_value, bound, stored_move)
+
             return best_value, best_move
 
+    def _pvs(self, game, depth, alpha=NEGATIVE_INFINITY, beta=POSITIVE_INFINITY, color=1):
+        """Implement depth-limited principal variation search (NegaScout) in
+        negamax form. The first move at each node is searched with the full
+        (alpha, beta) window and the others with a null window that only
+        tests whether they beat alpha; a move that does is searched again
+        with the full window.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        depth : int
+            Depth is an integer representing the maximum number of plies to
+            search in the game tree before aborting
+
+        alpha, beta : float
+            The search window from the point of view of the player to move
+
+        color : int
+            1 if the player to move is the player searching from the root,
+            and -1 otherwise
+
+        Returns
+        -------
+        (float, (int, int))
+            The value of the node from the point of view of the player to
+            move (i.e., `color` times the value for the root player), and the
+            best move found; the move is None if there are no legal moves
+        """
+        self._check_countdown -= 1
+        if self._check_countdown <= 0:
+            self._check_time()
+
+        if self.endgame is not None and game.move_count != self._root_ply:
+            wins = self.endgame.active_player_wins(game, self._count_node)
+            if wins is not None:
+                return (POSITIVE_INFINITY if wins else NEGATIVE_INFINITY), None
+
+        player = game.active_player
+        if depth == 0:
+            return color * self.score(game, player if color > 0 else game.inactive_player), None
+
+        # The transposition table is shared with _alphabeta, so its entries
+        # hold values and bounds from the point of view of the root player.
+        hash_move = None
+        tt = self.transposition_table
+        if tt is not None:
+            key, sym = tt.position_key(game)
+            if color < 0:
+                key ^= MIN_NODE_KEY
+            entry = tt.probe(key)
+            if entry is not None:
+                _, entry_depth, value, bound, hash_move, _ = entry
+                if sym:
+                    hash_move = game.knight_tables.transform_move(hash_move, sym, inverse=True)
+                value *= color
+                if color < 0 and bound != EXACT:
+                    bound = LOWER_BOUND if bound == UPPER_BOUND else UPPER_BOUND
+                if entry_depth >= depth and (
+                        bound == EXACT or (bound == LOWER_BOUND and value >= beta) or
+                        (bound == UPPER_BOUND and value <= alpha)):
+                    return value, hash_move
+            alpha_orig, beta_orig = alpha, beta
+
+        # As in _alphabeta, the moves of the expansion are the terminal test
+        moves = game.get_legal_moves(player)
+        if not moves:
+            return color * self.score(game, player if color > 0 else game.inactive_player), None
+        ordering = self.move_ordering
+        if ordering is not None:
+            moves = ordering.order(game, moves, hash_move)
+
+        best_value = NEGATIVE_INFINITY
+        best_move = None
+
+        for move in moves:
+            game.push(move)
+            try:
+                if best_move is None or alpha == NEGATIVE_INFINITY:
+                    v = -self._pvs(game, depth - 1, -beta, -alpha, -color)[0]
+                else:
+                    v = -self._pvs(game, depth - 1, -alpha - NULL_WINDOW, -alpha, -color)[0]
+                    if alpha < v < beta:
+                        v = -self._pvs(game, depth - 1, -beta, -alpha, -color)[0]
+            finally:
+                game.pop()
+
+            if best_move is None or v > best_value:
+                best_value, best_move = v, move
+            if game.move_count == self._root_ply:
+                self._note_root_result(move, v, alpha)
+            alpha = max(alpha, v)
+            if alpha >= beta:
+                if ordering is not None:
+                    ordering.record_cutoff(game, move, depth)
+                if self.stats is not None:
+                    self.stats.record_cutoff(move == moves[0])
+                break
+
+        if ordering is not None:
+            ordering.record_best(game, best_move)
+
+        if tt is not None:
+            if best_value <= alpha_orig:
+                bound = UPPER_BOUND if color > 0 else LOWER_BOUND
+            elif best_value >= beta_orig:
+                bound = LOWER_BOUND if color > 0 else UPPER_BOUND
+            else:
+                bound = EXACT
+            stored_move = game.knight_tables.transform_move(best_move, sym) if sym else best_move
+            tt.store(key, depth, color * best_value, bound, stored_move)
+
+        return best_value, best_move
 
     def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
         """Implement depth-limited minimax search with alpha-beta pruning as
@@ -558,5 +1389,5 @@ class AlphaBetaPlayer(IsolationPlayer):
                 testing.
         """
 
-        _, best_move = self._alphabeta(game, depth, alpha, beta)
-        return best_move or (-1, -1)
+        _, best_move = self._search_root(game, depth, alpha, beta)
+        return best_move
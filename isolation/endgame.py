@@ -0,0 +1,195 @@
+"""
+This file contains an exact solver for partitioned endgames of Isolation.
+
+Once no blank cell can be reached by knight moves from both players, the
+players can no longer interfere with each other and the game reduces to the
+longest knight path of each player inside its own region: the player to move
+wins if and only if its path is strictly longer than the opponent's.
+"""
+
+
+class EndgameSolver(object):
+    """Detect partitioned positions and solve them exactly with a memoised
+    longest-path search.
+
+    Parameters
+    ----------
+    max_region : int (optional)
+        The largest region (in blank cells) solved exactly; positions with a
+        larger region are left to the regular search, because the longest
+        path search is exponential in the region size.
+
+    probe_region : int (optional)
+        The largest region solved by `active_player_wins()`, which probes
+        the positions inside a search; it is smaller than `max_region`
+        because a search may probe many positions on the same move.
+
+    capacity : int (optional)
+        The maximum number of memoised regions; the memo is cleared when it
+        grows beyond this size.
+
+    symmetric : bool (optional)
+        If True, regions are memoised in canonical form so that the
+        symmetric images of a region share one entry.
+
+    Attributes
+    ----------
+    hits, misses : int
+        Counters of the longest-path lookups answered from the memo or
+        searched, respectively.
+    """
+
+    def __init__(self, max_region=20, probe_region=12, capacity=2**18, symmetric=False):
+        self.max_region = max_region
+        self.probe_region = probe_region
+        self.capacity = capacity
+        self.symmetric = symmetric
+        self.hits = 0
+        self.misses = 0
+        self._memo = {}
+
+    def clear(self):
+        """Drop all memoised regions and reset the counters."""
+        self._memo.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def regions(self, game):
+        """Return the bitmasks of the blank cells reachable by the active and
+        the inactive player (respectively), or None if the players have not
+        both been placed or some blank cell is reachable by both.
+        """
+        active_loc, inactive_loc = game._p1_loc, game._p2_loc
+        if active_loc is None or inactive_loc is None:
+            return None
+        if game.move_count & 1:
+            active_loc, inactive_loc = inactive_loc, active_loc
+        move_masks = game.knight_tables.move_masks
+        blank = game.get_blank_mask()
+        active = flood_fill(move_masks, active_loc, blank, stop=move_masks[inactive_loc])
+        if active is None:
+            return None
+        inactive = flood_fill(move_masks, inactive_loc, blank, stop=active)
+        if inactive is None:
+            return None
+        return active, inactive
+
+    def solve(self, game, check=None, max_region=None):
+        """Solve a partitioned position exactly.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            The position to solve; it is not modified.
+
+        check : callable (optional)
+            Called at every node of the longest path search; it may raise
+            (e.g., the timeout check of a search) to abort the solve, in
+            which case nothing partial is memoised.
+
+        max_region : int (optional)
+            Overrides `max_region` for this call.
+
+        Returns
+        -------
+        (int, int, (int, int)) or None
+            The number of moves left to the active and to the inactive
+            player, and the first move of the active player's longest path
+            (None if it has no move), or None if the position is not
+            partitioned or one of its regions exceeds `max_region` cells.
+        """
+        regions = self.regions(game)
+        if regions is None:
+            return None
+        active, inactive = regions
+        if max_region is None:
+            max_region = self.max_region
+        if max(bin(active).count("1"), bin(inactive).count("1")) > max_region:
+            return None
+        tables = game.knight_tables
+        active_loc, inactive_loc = game._p1_loc, game._p2_loc
+        if game.move_count & 1:
+            active_loc, inactive_loc = inactive_loc, active_loc
+        active_moves, first = self._longest_path(tables, active_loc, active, check)
+        inactive_moves, _ = self._longest_path(tables, inactive_loc, inactive, check)
+        move = tables.coords[first] if first is not None else None
+        return active_moves, inactive_moves, move
+
+    def active_player_wins(self, game, check=None):
+        """Return True or False if the active player wins or loses a solved
+        partitioned position, and None if the position cannot be solved
+        within `probe_region` cells. `check` is passed to `solve()`.
+        """
+        solution = self.solve(game, check, self.probe_region)
+        if solution is None:
+            return None
+        return solution[0] > solution[1]
+
+    def _longest_path(self, tables, loc, region, check=None):
+        """Return the length of the longest knight path from the cell index
+        `loc` through the cells of `region` (the blank cells reachable from
+        `loc`), and the cell index of its first step.
+        """
+        if self.symmetric:
+            key, sym = min(((tables.transform_mask(region, s), perm[loc]), s)
+                           for s, perm in enumerate(tables.symmetries))
+        else:
+            key, sym = (region, loc), 0
+        result = self._memo.get(key)
+        if result is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            result = self._search_path(tables, loc, region, check)
+            if sym and result[1] is not None:
+                result = (result[0], tables.symmetries[sym][result[1]])
+            if len(self._memo) >= self.capacity:
+                self._memo.clear()
+            self._memo[key] = result
+        if sym and result[1] is not None:
+            return result[0], tables.inverse_symmetries[sym][result[1]]
+        return result
+
+    def _search_path(self, tables, loc, region, check=None):
+        """Search the longest path of `_longest_path()` through the moves
+        from `loc`.
+        """
+        if check is not None:
+            check()
+        move_masks = tables.move_masks
+        best, first = 0, None
+        bound = bin(region).count("1")
+        options = move_masks[loc] & region
+        while options:
+            low = options & -options
+            options ^= low
+            idx = low.bit_length() - 1
+            rest = flood_fill(move_masks, idx, region ^ low)
+            if bin(rest).count("1") < best:
+                continue
+            length = 1 + self._longest_path(tables, idx, rest, check)[0]
+            if length > best:
+                best, first = length, idx
+                if best == bound:
+                    break
+        return best, first
+
+
+def flood_fill(move_masks, loc, open_mask, stop=0):
+    """Return the bitmask of the cells of `open_mask` reachable by knight
+    moves from the cell index `loc`, or None as soon as the reachable cells
+    intersect the `stop` mask.
+    """
+    reached = 0
+    frontier = move_masks[loc] & open_mask
+    while frontier:
+        if frontier & stop:
+            return None
+        reached |= frontier
+        step = 0
+        while frontier:
+            low = frontier & -frontier
+            step |= move_masks[low.bit_length() - 1]
+            frontier ^= low
+        frontier = step & open_mask & ~reached
+    return reached
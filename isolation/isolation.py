@@ -9,10 +9,175 @@ be available to project reviewers.
 """
 import random
 import timeit
-from copy import copy
 
 TIME_LIMIT_MILLIS = 150
 
+KNIGHT_DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                     (1, -2), (1, 2), (2, -1), (2, 1)]
+
+_KNIGHT_TABLES = {}
+
+
+class KnightTables(object):
+    """Precomputed knight-move neighbourhoods for one board geometry. Cells
+    are addressed by their bitboard index `row + col * height`.
+
+    Use `get_knight_tables()` to obtain the shared instance for a geometry
+    instead of constructing this class directly.
+
+    Attributes
+    ----------
+    coords : tuple<(int, int)>
+        The coordinate pair (row, column) of each cell index.
+
+    moves : tuple<tuple<int>>
+        The in-bounds knight destinations of each cell index.
+
+    move_masks : tuple<int>
+        The destinations in `moves` of each cell index as a bitmask.
+
+    two_step_masks : tuple<int>
+        Bitmask of the in-bounds cells at the sum of any two knight moves
+        from each cell index (regardless of the cell between them).
+
+    full_mask : int
+        Bitmask with the bit of every cell on the board set.
+
+    zobrist_blocked : tuple<int>
+        Random 64-bit Zobrist key of each cell index being blocked.
+
+    zobrist_locations : (tuple<int>, tuple<int>)
+        Random 64-bit Zobrist keys of player 1 and player 2 (respectively)
+        standing on each cell index.
+
+    zobrist_side : int
+        Random 64-bit Zobrist key for player 2 holding the initiative.
+
+    symmetries : tuple<tuple<int>>
+        The symmetries of the board as permutations of the cell indices
+        (`symmetries[s][idx]` is the image of cell `idx`): the identity
+        first, then the mirror images, plus the rotations and diagonal
+        mirrors on square boards (4 symmetries, or 8 on square boards).
+
+    inverse_symmetries : tuple<tuple<int>>
+        The inverse permutation of each symmetry.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        size = width * height
+        self.full_mask = (1 << size) - 1
+        self.coords = tuple((idx % height, idx // height) for idx in range(size))
+
+        def index(r, c):
+            if 0 <= r < height and 0 <= c < width:
+                return r + c * height
+            return None
+
+        two_steps = set((r1 + r2, c1 + c2)
+                        for r1, c1 in KNIGHT_DIRECTIONS
+                        for r2, c2 in KNIGHT_DIRECTIONS)
+        moves, move_masks, two_step_masks = [], [], []
+        for r, c in self.coords:
+            dests = [index(r + dr, c + dc) for dr, dc in KNIGHT_DIRECTIONS]
+            dests = tuple(d for d in dests if d is not None)
+            moves.append(dests)
+            move_masks.append(sum(1 << d for d in dests))
+            reach = [index(r + dr, c + dc) for dr, dc in two_steps]
+            two_step_masks.append(sum(1 << d for d in reach if d is not None))
+        self.moves = tuple(moves)
+        self.move_masks = tuple(move_masks)
+        self.two_step_masks = tuple(two_step_masks)
+
+        # The keys are seeded from the geometry so that every process builds
+        # the same keys, and hashes can be shared between them (or saved).
+        rng = random.Random("zobrist-{}x{}".format(width, height))
+        self.zobrist_blocked = tuple(rng.getrandbits(64) for _ in range(size))
+        self.zobrist_locations = (tuple(rng.getrandbits(64) for _ in range(size)),
+                                  tuple(rng.getrandbits(64) for _ in range(size)))
+        self.zobrist_side = rng.getrandbits(64)
+
+        flips = [lambda r, c: (r, c),
+                 lambda r, c: (height - 1 - r, c),
+                 lambda r, c: (r, width - 1 - c),
+                 lambda r, c: (height - 1 - r, width - 1 - c)]
+        if width == height:
+            flips += [lambda r, c, f=f: f(c, r) for f in flips]
+        self.symmetries = tuple(tuple(index(*f(r, c)) for r, c in self.coords)
+                                for f in flips)
+        self.inverse_symmetries = tuple(tuple(perm.index(idx) for idx in range(size))
+                                        for perm in self.symmetries)
+
+        # The image under each symmetry of every byte of a cell mask, as a
+        # mask and as the Zobrist key of the blocked cells, so that a whole
+        # mask is transformed with one lookup per 8 cells.
+        self._mask_bytes = []
+        self._zobrist_bytes = []
+        for perm in self.symmetries:
+            masks, keys = [], []
+            for base in range(0, size, 8):
+                byte_masks, byte_keys = [0] * 256, [0] * 256
+                for byte in range(1, 256):
+                    low = byte & -byte
+                    idx = base + low.bit_length() - 1
+                    if idx < size:
+                        byte_masks[byte] = byte_masks[byte ^ low] | 1 << perm[idx]
+                        byte_keys[byte] = byte_keys[byte ^ low] ^ self.zobrist_blocked[perm[idx]]
+                masks.append(tuple(byte_masks))
+                keys.append(tuple(byte_keys))
+            self._mask_bytes.append(tuple(masks))
+            self._zobrist_bytes.append(tuple(keys))
+
+    def __reduce__(self):
+        # Unpickled tables (e.g., of a board sent to another process) are
+        # looked up in the shared cache of the receiving process.
+        return get_knight_tables, (self.width, self.height)
+
+    def cells(self, mask):
+        """Return the list of coordinate pairs (row, column) of the cells
+        whose bits are set in the input bitmask, in index order.
+        """
+        coords = self.coords
+        cells = []
+        while mask:
+            low = mask & -mask
+            cells.append(coords[low.bit_length() - 1])
+            mask ^= low
+        return cells
+
+    def transform_mask(self, mask, sym):
+        """Return the image of a cell bitmask under the symmetry `sym` (an
+        index into `symmetries`).
+        """
+        byte_masks = self._mask_bytes[sym]
+        image = 0
+        for masks in byte_masks:
+            if not mask:
+                break
+            image |= masks[mask & 255]
+            mask >>= 8
+        return image
+
+    def transform_move(self, move, sym, inverse=False):
+        """Return the image of a coordinate pair (row, column) under the
+        symmetry `sym`, or under its inverse; None is returned unchanged.
+        """
+        if move is None:
+            return None
+        perms = self.inverse_symmetries if inverse else self.symmetries
+        return self.coords[perms[sym][move[0] + move[1] * self.height]]
+
+
+def get_knight_tables(width, height):
+    """Return the shared `KnightTables` for a board geometry, building them
+    the first time the geometry is requested.
+    """
+    tables = _KNIGHT_TABLES.get((width, height))
+    if tables is None:
+        tables = _KNIGHT_TABLES[(width, height)] = KnightTables(width, height)
+    return tables
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -33,41 +198,113 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    seed : int (optional)
+        If given, the shuffled move order (see `shuffle`) is drawn from a
+        random generator seeded with this value and owned by the board (and
+        shared with its copies), so that a game is reproducible
+        independently of the global `random` module. If None (the default)
+        the moves are shuffled with the global `random` module.
+
+    shuffle : bool (optional)
+        If True, `get_legal_moves()` returns the moves in random order. If
+        False (the default) the moves are returned in a fixed order.
     """
     BLANK = 0
     NOT_MOVED = None
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    # Boards are copied at every node of some searches and kept in caches,
+    # so they store no instance __dict__
+    __slots__ = ("width", "height", "move_count", "knight_tables", "_player_1",
+                 "_player_2", "_blocked", "_p1_loc", "_p2_loc", "_hash",
+                 "_undo_stack", "_shuffle", "_rng")
+
+    def __init__(self, player_1, player_2, width=7, height=7, seed=None, shuffle=False):
         self.width = width
         self.height = height
         self.move_count = 0
+        self.knight_tables = get_knight_tables(width, height)
         self._player_1 = player_1
         self._player_2 = player_2
-        self._active_player = player_1
-        self._inactive_player = player_2
 
-        # The last 3 entries of the board state includes initiative (0 for
-        # player 1, 1 for player 2) player 2 last move, and player 1 last move
-        self._board_state = [Board.BLANK] * (width * height + 3)
-        self._board_state[-1] = Board.NOT_MOVED
-        self._board_state[-2] = Board.NOT_MOVED
+        # The board is stored as a bitboard: bit `row + col * height` of
+        # _blocked is set once the cell (row, col) has been occupied, and the
+        # location of each player is the index of its current cell (or
+        # NOT_MOVED before the player is placed). Initiative is the parity of
+        # move_count (0 for player 1, 1 for player 2): internally players are
+        # addressed by this side bit, and player objects are only compared
+        # when they are passed in through the public methods.
+        self._blocked = 0
+        self._p1_loc = Board.NOT_MOVED
+        self._p2_loc = Board.NOT_MOVED
+
+        # Zobrist hash of the position, updated incrementally by apply_move()
+        # and pop(); the empty board with player 1 to move hashes to 0.
+        self._hash = 0
+
+        # Previous locations of the players moved by push(), popped by pop()
+        self._undo_stack = []
+
+        # Generator of the move order; None stands for the global generator
+        self._shuffle = shuffle
+        self._rng = random.Random(seed) if seed is not None else None
 
     def hash(self):
-        return str(self._board_state).__hash__()
+        """Return the Zobrist hash of the current state (blocked cells,
+        player locations and initiative). The hash is maintained
+        incrementally as moves are applied, so this is an O(1) lookup.
+        """
+        return self._hash
+
+    def canonical_form(self):
+        """Return the canonical hash of the current state, i.e., the smallest
+        Zobrist hash of the images of the board under its symmetries, and
+        the index of the symmetry (in `knight_tables.symmetries`) mapping
+        the board onto that image. Symmetric positions share the canonical
+        hash; moves are mapped onto the canonical board (and back) with
+        `knight_tables.transform_move()`.
+        """
+        tables = self.knight_tables
+        keys_1, keys_2 = tables.zobrist_locations
+        p1_loc, p2_loc = self._p1_loc, self._p2_loc
+        side = tables.zobrist_side if self.move_count & 1 else 0
+        best, best_sym = None, 0
+        for sym, byte_keys in enumerate(tables._zobrist_bytes):
+            perm = tables.symmetries[sym]
+            h = side
+            mask = self._blocked
+            for keys in byte_keys:
+                if not mask:
+                    break
+                h ^= keys[mask & 255]
+                mask >>= 8
+            if p1_loc is not None:
+                h ^= keys_1[perm[p1_loc]]
+            if p2_loc is not None:
+                h ^= keys_2[perm[p2_loc]]
+            if best is None or h < best:
+                best, best_sym = h, sym
+        return best, best_sym
+
+    def canonical_hash(self):
+        """Return the canonical hash of the current state, shared by all
+        the positions equivalent to it under the symmetries of the board.
+        """
+        return self.canonical_form()[0]
 
     @property
     def active_player(self):
         """The object registered as the player holding initiative in the
         current game state.
         """
-        return self._active_player
+        return self._player_2 if self.move_count & 1 else self._player_1
 
     @property
     def inactive_player(self):
         """The object registered as the player in waiting for the current
         game state.
         """
-        return self._inactive_player
+        return self._player_1 if self.move_count & 1 else self._player_2
 
     def get_opponent(self, player):
         """Return the opponent of the supplied player.
@@ -84,19 +321,48 @@ class Board(object):
         object
             The opponent of the input player object.
         """
-        if player == self._active_player:
-            return self._inactive_player
-        elif player == self._inactive_player:
-            return self._active_player
+        if player is self._player_1 or player == self._player_1:
+            return self._player_2
+        elif player is self._player_2 or player == self._player_2:
+            return self._player_1
         raise RuntimeError("`player` must be an object registered as a player in the current game.")
 
     def copy(self):
         """ Return a deep copy of the current board. """
-        new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height)
+        new_board = self.__class__.__new__(self.__class__)
+        new_board.width = self.width
+        new_board.height = self.height
         new_board.move_count = self.move_count
-        new_board._active_player = self._active_player
-        new_board._inactive_player = self._inactive_player
-        new_board._board_state = copy(self._board_state)
+        new_board.knight_tables = self.knight_tables
+        new_board._player_1 = self._player_1
+        new_board._player_2 = self._player_2
+        new_board._blocked = self._blocked
+        new_board._p1_loc = self._p1_loc
+        new_board._p2_loc = self._p2_loc
+        new_board._hash = self._hash
+        new_board._undo_stack = []
+        new_board._shuffle = self._shuffle
+        new_board._rng = self._rng
+        return new_board
+
+    def copy_with_players(self, player_1, player_2):
+        """Return a deep copy of the current board in which the registered
+        players are replaced by the input objects (e.g., to send the game
+        state to another process without the original player objects).
+
+        Parameters
+        ----------
+        player_1, player_2 : object
+            The objects taking the places of player 1 and player 2.
+
+        Returns
+        -------
+        isolation.Board
+            A deep copy of the board with the replacement players.
+        """
+        new_board = self.copy()
+        new_board._player_1 = player_1
+        new_board._player_2 = player_2
         return new_board
 
     def forecast_move(self, move):
@@ -132,15 +398,20 @@ class Board(object):
         bool
             Returns True if the move is legal, False otherwise
         """
-        idx = move[0] + move[1] * self.height
-        return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
-                self._board_state[idx] == Board.BLANK)
+        row, col = move
+        return (0 <= row < self.height and 0 <= col < self.width and
+                not self._blocked >> (row + col * self.height) & 1)
 
     def get_blank_spaces(self):
         """Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-                if self._board_state[i + j * self.height] == Board.BLANK]
+        return self.knight_tables.cells(self.get_blank_mask())
+
+    def get_blank_mask(self):
+        """Return a bitmask with the bit `row + col * height` of every blank
+        cell on the board set.
+        """
+        return self.knight_tables.full_mask & ~self._blocked
 
     def get_player_location(self, player):
         """Find the current location of the specified player on the board.
@@ -156,20 +427,10 @@ class Board(object):
             The coordinate pair (row, column) of the input player, or None
             if the player has not moved.
         """
-        if player == self._player_1:
-            if self._board_state[-1] == Board.NOT_MOVED:
-                return Board.NOT_MOVED
-            idx = self._board_state[-1]
-        elif player == self._player_2:
-            if self._board_state[-2] == Board.NOT_MOVED:
-                return Board.NOT_MOVED
-            idx = self._board_state[-2]
-        else:
-            raise RuntimeError(
-                "Invalid player in get_player_location: {}".format(player))
-        w = idx // self.height
-        h = idx % self.height
-        return (h, w)
+        idx = self.__get_location_index(player)
+        if idx == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return self.knight_tables.coords[idx]
 
     def get_legal_moves(self, player=None):
         """Return the list of all legal moves for the specified player.
@@ -187,8 +448,40 @@ class Board(object):
             for the player constrained by the current game state.
         """
         if player is None:
-            player = self.active_player
-        return self.__get_moves(self.get_player_location(player))
+            return self.__get_moves(self._p2_loc if self.move_count & 1 else self._p1_loc)
+        return self.__get_moves(self.__get_location_index(player))
+
+    def get_legal_move_mask(self, player=None):
+        """Return a bitmask with the bit `row + col * height` of every legal
+        move of the specified player (or of the active player if None) set.
+        Unlike `get_legal_moves()`, this allocates no list of moves.
+        """
+        if player is None:
+            idx = self._p2_loc if self.move_count & 1 else self._p1_loc
+        else:
+            idx = self.__get_location_index(player)
+        if idx == Board.NOT_MOVED:
+            return self.knight_tables.full_mask & ~self._blocked
+        return self.knight_tables.move_masks[idx] & ~self._blocked
+
+    def count_legal_moves(self, player=None):
+        """Return the number of legal moves of the specified player (or of
+        the active player if None), i.e., `len(get_legal_moves(player))`
+        without building the list.
+        """
+        return bin(self.get_legal_move_mask(player)).count("1")
+
+    def iter_legal_moves(self, player=None):
+        """Iterate over the legal moves of the specified player (or of the
+        active player if None) in increasing order of cell index, without
+        building a list or shuffling them.
+        """
+        coords = self.knight_tables.coords
+        mask = self.get_legal_move_mask(player)
+        while mask:
+            low = mask & -mask
+            yield coords[low.bit_length() - 1]
+            mask ^= low
 
     def apply_move(self, move):
         """Move the active player to a specified location.
@@ -200,20 +493,67 @@ class Board(object):
             the active player on the board.
         """
         idx = move[0] + move[1] * self.height
-        last_move_idx = int(self.active_player == self._player_2) + 1
-        self._board_state[-last_move_idx] = idx
-        self._board_state[idx] = 1
-        self._board_state[-3] ^= 1
-        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        tables = self.knight_tables
+        if self.move_count & 1:
+            keys = tables.zobrist_locations[1]
+            prev_loc, self._p2_loc = self._p2_loc, idx
+        else:
+            keys = tables.zobrist_locations[0]
+            prev_loc, self._p1_loc = self._p1_loc, idx
+        h = self._hash ^ tables.zobrist_blocked[idx] ^ tables.zobrist_side ^ keys[idx]
+        if prev_loc != Board.NOT_MOVED:
+            h ^= keys[prev_loc]
+        self._hash = h
+        self._blocked |= 1 << idx
         self.move_count += 1
 
+    def push(self, move):
+        """Apply a move in-place exactly like `apply_move()`, but remember
+        enough of the current state to revert the move with `pop()`. This
+        lets a search walk the game tree on a single board instead of
+        allocating a copy with `forecast_move()` at every node.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        self._undo_stack.append(self._p2_loc if self.move_count & 1 else self._p1_loc)
+        self.apply_move(move)
+
+    def pop(self):
+        """Revert the most recent move applied with `push()`, restoring the
+        board to the state it had before that move.
+
+        Copies of the board start with an empty undo stack, so only moves
+        pushed onto this board object can be popped.
+        """
+        try:
+            prev_loc = self._undo_stack.pop()
+        except IndexError:
+            raise RuntimeError("There are no pushed moves left to pop.")
+        self.move_count -= 1
+        tables = self.knight_tables
+        if self.move_count & 1:
+            keys = tables.zobrist_locations[1]
+            idx, self._p2_loc = self._p2_loc, prev_loc
+        else:
+            keys = tables.zobrist_locations[0]
+            idx, self._p1_loc = self._p1_loc, prev_loc
+        h = self._hash ^ tables.zobrist_blocked[idx] ^ tables.zobrist_side ^ keys[idx]
+        if prev_loc != Board.NOT_MOVED:
+            h ^= keys[prev_loc]
+        self._hash = h
+        self._blocked ^= 1 << idx
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self._inactive_player and not self.get_legal_moves(self._active_player)
+        return self.__get_side(player) == (self.move_count & 1 ^ 1) and not self.get_legal_move_mask()
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self._active_player and not self.get_legal_moves(self._active_player)
+        return self.__get_side(player) == self.move_count & 1 and not self.get_legal_move_mask()
 
     def utility(self, player):
         """Returns the utility of the current game state from the perspective
@@ -237,29 +577,56 @@ class Board(object):
             a value of -inf if the player has lost, and a value of 0
             otherwise.
         """
-        if not self.get_legal_moves(self._active_player):
+        if not self.get_legal_move_mask():
+            side = self.__get_side(player)
 
-            if player == self._inactive_player:
+            if side == self.move_count & 1 ^ 1:
                 return float("inf")
 
-            if player == self._active_player:
+            if side == self.move_count & 1:
                 return float("-inf")
 
         return 0.
 
-    def __get_moves(self, loc):
+    def __get_side(self, player):
+        """Return the side of the specified player (0 for player 1 and 1 for
+        player 2), or None if the object is not registered as a player. The
+        active player is matched first, in case both sides are registered
+        with the same object.
+        """
+        side = self.move_count & 1
+        active = self._player_2 if side else self._player_1
+        if player is active or player == active:
+            return side
+        inactive = self._player_1 if side else self._player_2
+        if player is inactive or player == inactive:
+            return side ^ 1
+        return None
+
+    def __get_location_index(self, player):
+        """Return the cell index of the specified player, or NOT_MOVED if
+        the player has not been placed on the board.
+        """
+        if player is self._player_1 or player == self._player_1:
+            return self._p1_loc
+        elif player is self._player_2 or player == self._player_2:
+            return self._p2_loc
+        raise RuntimeError(
+            "Invalid player in get_player_location: {}".format(player))
+
+    def __get_moves(self, idx):
         """Generate the list of possible moves for an L-shaped motion (like a
-        knight in chess).
+        knight in chess) from the cell index `idx`.
         """
-        if loc == Board.NOT_MOVED:
+        if idx == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = loc
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2), (1, 2), (2, -1), (2, 1)]
-        valid_moves = [(r + dr, c + dc) for dr, dc in directions
-                       if self.move_is_legal((r + dr, c + dc))]
-        random.shuffle(valid_moves)
+        blocked = self._blocked
+        coords = self.knight_tables.coords
+        valid_moves = [coords[dest] for dest in self.knight_tables.moves[idx]
+                       if not blocked >> dest & 1]
+        if self._shuffle:
+            (self._rng or random).shuffle(valid_moves)
         return valid_moves
 
     def print_board(self):
@@ -271,8 +638,8 @@ class Board(object):
         the location of each player and indicating which cells have been
         blocked, and which remain open.
         """
-        p1_loc = self._board_state[-1]
-        p2_loc = self._board_state[-2]
+        p1_loc = self._p1_loc
+        p2_loc = self._p2_loc
 
         col_margin = len(str(self.height - 1)) + 1
         prefix = "{:<" + "{}".format(col_margin) + "}"
@@ -282,7 +649,7 @@ class Board(object):
             out += prefix.format(i) + ' | '
             for j in range(self.width):
                 idx = i + j * self.height
-                if not self._board_state[idx]:
+                if not self._blocked >> idx & 1:
                     out += ' '
                 elif p1_loc == idx:
                     out += symbols[0]
@@ -323,19 +690,19 @@ class Board(object):
 
             move_start = time_millis()
             time_left = lambda : time_limit - (time_millis() - move_start)
-            curr_move = self._active_player.get_move(game_copy, time_left)
+            curr_move = self.active_player.get_move(game_copy, time_left)
             move_end = time_left()
 
             if curr_move is None:
                 curr_move = Board.NOT_MOVED
 
             if move_end < 0:
-                return self._inactive_player, move_history, "timeout"
+                return self.inactive_player, move_history, "timeout"
 
             if curr_move not in legal_player_moves:
                 if len(legal_player_moves) > 0:
-                    return self._inactive_player, move_history, "forfeit"
-                return self._inactive_player, move_history, "illegal move"
+                    return self.inactive_player, move_history, "forfeit"
+                return self.inactive_player, move_history, "illegal move"
 
             move_history.append(list(curr_move))
 
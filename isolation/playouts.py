@@ -0,0 +1,134 @@
+"""
+This file contains a NumPy playout engine that plays batches of random games
+of Isolation in lock-step: each game of the batch is a row of a boolean array
+of blocked cells plus the cell indices of the two players, so every ply of
+the whole batch is advanced by a handful of array operations instead of a
+Python loop per game.
+
+The module depends on NumPy, so it is not imported by the `isolation`
+package; use `from isolation.playouts import random_playouts`.
+"""
+import numpy as np
+
+from .isolation import get_knight_tables
+
+NO_CELL = -1
+
+
+class PlayoutTables(object):
+    """Knight-move destinations of one board geometry as a padded array.
+
+    Attributes
+    ----------
+    size : int
+        The number of cells of the board; index `size` is a sentinel cell
+        that is always blocked.
+
+    destinations : numpy.ndarray
+        An array of shape (size + 1, 8) holding the knight destinations of
+        each cell index, padded with the sentinel index.
+    """
+
+    def __init__(self, width, height):
+        tables = get_knight_tables(width, height)
+        self.size = width * height
+        self.destinations = np.full((self.size + 1, 8), self.size, dtype=np.intp)
+        for idx, dests in enumerate(tables.moves):
+            self.destinations[idx, :len(dests)] = dests
+
+
+_PLAYOUT_TABLES = {}
+
+
+def get_playout_tables(width, height):
+    """Return the shared `PlayoutTables` of a board geometry."""
+    key = (width, height)
+    if key not in _PLAYOUT_TABLES:
+        _PLAYOUT_TABLES[key] = PlayoutTables(width, height)
+    return _PLAYOUT_TABLES[key]
+
+
+def random_playouts(games, playouts=1000, seed=None):
+    """Play `playouts` uniformly random games to the end from each of the
+    starting positions and count the wins of the player to move.
+
+    Parameters
+    ----------
+    games : list<isolation.Board>
+        The starting positions; they must all share the same geometry and
+        are not modified.
+
+    playouts : int (optional)
+        The number of random games played from each starting position.
+
+    seed : int or numpy.random.Generator (optional)
+        Seed of the random moves.
+
+    Returns
+    -------
+    numpy.ndarray
+        The number of playouts won by the active player of each starting
+        position, as an integer array of shape (len(games),).
+    """
+    if not games:
+        return np.zeros(0, dtype=np.intp)
+    width, height = games[0].width, games[0].height
+    if any((g.width, g.height) != (width, height) for g in games):
+        raise ValueError("All the starting positions must have the same geometry")
+    tables = get_playout_tables(width, height)
+    size = tables.size
+    rng = np.random.default_rng(seed)
+
+    # Starting positions, each repeated once per playout
+    blocked = np.zeros((len(games), size + 1), dtype=bool)
+    locations = np.full((len(games), 2), NO_CELL, dtype=np.intp)
+    start_side = np.zeros(len(games), dtype=np.intp)
+    for row, game in enumerate(games):
+        mask = game.get_blank_mask() ^ game.knight_tables.full_mask
+        blocked[row, :size] = [(mask >> idx) & 1 for idx in range(size)]
+        for player, loc in enumerate((game._p1_loc, game._p2_loc)):
+            if loc is not None:
+                locations[row, player] = loc
+        start_side[row] = game.move_count & 1
+    blocked[:, size] = True
+    blocked = np.repeat(blocked, playouts, axis=0)
+    locations = np.repeat(locations, playouts, axis=0)
+    side = np.repeat(start_side, playouts)
+    winner = np.full(len(side), NO_CELL, dtype=np.intp)
+
+    live = np.arange(len(side))
+    while len(live):
+        current = locations[live, side[live]]
+        moves = np.full(len(live), NO_CELL, dtype=np.intp)
+
+        # Placed players choose among their open knight destinations
+        placed = current != NO_CELL
+        rows = live[placed]
+        if len(rows):
+            dests = tables.destinations[current[placed]]
+            keys = rng.random(dests.shape)
+            keys[blocked[rows[:, None], dests]] = -1.
+            choice = keys.argmax(axis=1)
+            picked = dests[np.arange(len(rows)), choice]
+            picked[keys[np.arange(len(rows)), choice] < 0] = NO_CELL
+            moves[placed] = picked
+
+        # Players that have not moved yet may choose any blank cell
+        if not placed.all():
+            rows = live[~placed]
+            keys = rng.random((len(rows), size + 1))
+            keys[blocked[rows]] = -1.
+            choice = keys.argmax(axis=1)
+            choice[keys[np.arange(len(rows)), choice] < 0] = NO_CELL
+            moves[~placed] = choice
+
+        # The player to move loses when there is no legal move left
+        stuck = moves == NO_CELL
+        winner[live[stuck]] = 1 - side[live[stuck]]
+        live, moves = live[~stuck], moves[~stuck]
+        blocked[live, moves] = True
+        locations[live, side[live]] = moves
+        side[live] ^= 1
+
+    won = (winner == np.repeat(start_side, playouts)).reshape(len(games), playouts)
+    return won.sum(axis=1)
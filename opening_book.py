@@ -0,0 +1,166 @@
+"""Build and query an opening book of Isolation positions.
+
+The builder enumerates every position of the first plies of the game (up to
+the symmetries of the board), searches each of them to a fixed depth with an
+`AlphaBetaPlayer`, and writes the best moves to a JSON file. The file holds
+plain JSON types only, so it can be submitted as the `data.json` of the PvP
+agent:
+
+    {"width": 7, "height": 7, "plies": 4, "depth": 8,
+     "positions": {"<canonical hash>": [<row>, <column>]}}
+
+Positions are keyed by the hexadecimal canonical hash of the board (see
+`Board.canonical_form()`), which is shared by all the symmetric images of a
+position, and moves are stored on the canonical board.
+
+    python opening_book.py --plies 4 --depth 8 --output data.json
+"""
+import argparse
+import json
+import random
+
+from isolation import Board
+from game_agent import AlphaBetaPlayer, MoveOrdering, TranspositionTable, custom_score
+
+
+class OpeningBook:
+    """A table of the best move of the early positions of the game.
+
+    Parameters
+    ----------
+    width, height : int (optional)
+        The geometry of the boards in the book.
+
+    positions : dict (optional)
+        The best move (on the canonical board) of each canonical hash, in
+        hexadecimal.
+
+    Attributes
+    ----------
+    hits, misses : int
+        Counters of the lookups that found a move or not, respectively.
+    """
+
+    def __init__(self, width=7, height=7, positions=None):
+        self.width = width
+        self.height = height
+        self.positions = positions if positions is not None else {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path):
+        """Read a book written by `save()`."""
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["width"], data["height"], data["positions"])
+
+    def save(self, path, **metadata):
+        """Write the book (and any extra metadata entries) to a JSON file."""
+        data = dict(metadata, width=self.width, height=self.height,
+                    positions=self.positions)
+        with open(path, "w") as f:
+            json.dump(data, f, separators=(",", ":"), sort_keys=True)
+
+    def key(self, game):
+        """Return the book key of the position and the index of the board
+        symmetry that maps it onto its canonical form.
+        """
+        key, sym = game.canonical_form()
+        return "{:x}".format(key), sym
+
+    def add(self, game, move):
+        """Record the best move of a position."""
+        key, sym = self.key(game)
+        self.positions[key] = list(game.knight_tables.transform_move(move, sym))
+
+    def lookup(self, game):
+        """Return the book move of the position, or None if the position is
+        not in the book.
+        """
+        if (game.width, game.height) != (self.width, self.height):
+            return None
+        key, sym = self.key(game)
+        move = self.positions.get(key)
+        if move is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return game.knight_tables.transform_move(move, sym, inverse=True)
+
+
+def build_book(plies=4, depth=8, score_fn=custom_score, width=7, height=7, progress=None):
+    """Search every position of the first plies of the game, up to symmetry.
+
+    Parameters
+    ----------
+    plies : int (optional)
+        The number of plies covered: the book holds the positions with
+        `move_count < plies`.
+
+    depth : int (optional)
+        The fixed depth of the search of each position.
+
+    score_fn : callable (optional)
+        The evaluation function of the search.
+
+    progress : callable (optional)
+        Called with the ply, the index and the count of the positions of
+        that ply after each search.
+
+    Returns
+    -------
+    OpeningBook
+    """
+    book = OpeningBook(width, height)
+    player = AlphaBetaPlayer(score_fn=score_fn, transposition_table=TranspositionTable(),
+                             move_ordering=MoveOrdering())
+    player.time_left = lambda: float("inf")
+    frontier = {None: Board("player_1", "player_2", width, height)}
+    for ply in range(plies):
+        for i, game in enumerate(frontier.values()):
+            player.transposition_table.new_search()
+            player.move_ordering.new_search()
+            move = player.alphabeta(game, depth)
+            if move != (-1, -1):
+                book.add(game, move)
+            if progress is not None:
+                progress(ply, i + 1, len(frontier))
+        if ply + 1 < plies:
+            successors = {}
+            for game in frontier.values():
+                for move in game.get_legal_moves():
+                    child = game.forecast_move(move)
+                    successors.setdefault(book.key(child)[0], child)
+            frontier = successors
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book of " +
+                                     "searched Isolation positions.")
+    parser.add_argument("-p", "--plies", type=int, default=4,
+                        help="number of plies covered by the book")
+    parser.add_argument("-d", "--depth", type=int, default=8,
+                        help="search depth of each position")
+    parser.add_argument("-o", "--output", default="data.json",
+                        help="path of the JSON book")
+    parser.add_argument("-s", "--seed", type=int, default=0,
+                        help="seed of the move order of the searches")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    def progress(ply, i, count):
+        print("\rPly {}: {}/{} positions".format(ply, i, count), end="",
+              flush=True)
+        if i == count:
+            print()
+
+    book = build_book(args.plies, args.depth, progress=progress)
+    book.save(args.output, plies=args.plies, depth=args.depth)
+    print("Wrote {} positions to {}".format(len(book.positions), args.output))
+
+
+if __name__ == "__main__":
+    main()
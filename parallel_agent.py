@@ -0,0 +1,206 @@
+"""
+This file contains a multi-process version of the `AlphaBetaPlayer` of
+game_agent.py.
+
+The module depends on `concurrent.futures` and `timeit`, which the Project
+Assistant sandbox does not allow, so it is kept out of game_agent.py; use
+`from parallel_agent import ParallelAlphaBetaPlayer`.
+"""
+import random
+import timeit
+
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from game_agent import (AlphaBetaPlayer, SearchTimeout, onward_moves,
+                        NEGATIVE_INFINITY, POSITIVE_INFINITY)
+
+
+def search_root_moves(player, game, moves, depth):
+    """Search a subset of the root moves of the game to the given depth with
+    the search algorithm selected on an `AlphaBetaPlayer`.
+
+    Returns
+    -------
+    (float, (int, int))
+        The score for the root player of the best of the moves, and the move
+    """
+    alpha = NEGATIVE_INFINITY
+    best_value, best_move = NEGATIVE_INFINITY, None
+    for move in moves:
+        game.push(move)
+        try:
+            if player.search == "pvs":
+                v = -player._pvs(game, depth - 1, NEGATIVE_INFINITY, -alpha, -1)[0]
+            else:
+                v, _ = player._alphabeta(game, depth - 1, alpha, POSITIVE_INFINITY,
+                                         maximizing_player=False)
+        finally:
+            game.pop()
+        if best_move is None or v > best_value:
+            best_value, best_move = v, move
+        alpha = max(alpha, v)
+    return best_value, best_move
+
+
+# The copy of the ParallelAlphaBetaPlayer searching in a worker process
+_search_helper = None
+
+
+def _init_search_worker(player):
+    global _search_helper
+    _search_helper = player
+
+
+def _search_worker(game, moves, deadline, start_depth, seed):
+    """Search the root moves by iterative deepening in a worker process until
+    the `timeit.default_timer()` deadline, starting at `start_depth` and
+    shuffling the moves with `seed` (if any).
+
+    Returns
+    -------
+    list<(int, float, (int, int))>
+        The depth, score and best move of every completed iteration
+    """
+    player = _search_helper
+    player._start_clock(lambda: 1000 * (deadline - timeit.default_timer()) + player.TIMER_THRESHOLD)
+    if player.transposition_table is not None:
+        player.transposition_table.new_search()
+    if player.move_ordering is not None:
+        player.move_ordering.new_search()
+    if seed is not None:
+        moves = list(moves)
+        random.Random(seed).shuffle(moves)
+
+    results = []
+    try:
+        for depth in range(start_depth, bin(game.get_blank_mask()).count("1") + 1):
+            value, move = search_root_moves(player, game, moves, depth)
+            results.append((depth, value, move))
+    except SearchTimeout:
+        pass
+    return results
+
+
+class ParallelAlphaBetaPlayer(AlphaBetaPlayer):
+    """Game-playing agent that runs the iterative deepening alpha-beta search
+    of `AlphaBetaPlayer` in a pool of worker processes (threads would all be
+    serialized by the GIL).
+
+    In "root" mode the root moves are split between the workers, each of
+    which deepens its own share of moves; the best move is chosen among the
+    results of the deepest iteration completed by every worker. In "lazy"
+    mode (Lazy SMP) every worker searches all root moves, in a different
+    order and starting at staggered depths, and the result of the deepest
+    completed iteration wins. The workers keep their own transposition
+    tables and move ordering state between moves.
+
+    The pool is started by the first call to `get_move()` (or by `start()`,
+    which avoids spending the first move's time budget on it) and must be
+    shut down with `close()`.
+
+    Parameters
+    ----------
+    workers : int (optional)
+        The number of worker processes.
+
+    parallel_mode : str (optional)
+        "root" for root splitting or "lazy" for Lazy SMP helpers.
+
+    ipc_margin : float (optional)
+        Milliseconds reserved to collect the results of the workers before
+        the search timeout.
+
+    All other keyword arguments are passed to `AlphaBetaPlayer`.
+    """
+    PARALLEL_MODES = ("root", "lazy")
+
+    def __init__(self, workers=2, parallel_mode="root", ipc_margin=5., **kwargs):
+        super().__init__(**kwargs)
+        if parallel_mode not in self.PARALLEL_MODES:
+            raise ValueError("`parallel_mode` must be one of {}.".format(self.PARALLEL_MODES))
+        self.workers = workers
+        self.parallel_mode = parallel_mode
+        self.ipc_margin = ipc_margin
+        self._pool = None
+
+    def __getstate__(self):
+        # The worker processes receive a copy of the player without the pool
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        state["time_left"] = None
+        return state
+
+    def start(self):
+        """Start the pool of worker processes if it is not running."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             initializer=_init_search_worker,
+                                             initargs=(self,))
+
+    def close(self):
+        """Shut down the pool of worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def get_move(self, game, time_left):
+        """Search for the best move with the worker processes and return it
+        before the time limit expires.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        -------
+        (int, int)
+            Board coordinates corresponding to a legal move; may return
+            (-1, -1) if there are no available legal moves.
+        """
+        self._start_clock(time_left)
+        legal_moves = game.get_legal_moves()
+        if len(legal_moves) < 2:
+            return legal_moves[0] if legal_moves else (-1, -1)
+
+        self.start()
+        now = timeit.default_timer()
+        budget = (time_left() - self.TIMER_THRESHOLD) / 1000
+        deadline = now + budget - self.ipc_margin / 1000
+
+        # The workers receive the state with placeholder players, since the
+        # player objects of the game may not be picklable
+        root = game.copy_with_players("player_1", "player_2")
+        if self.parallel_mode == "root":
+            legal_moves.sort(key=lambda m: onward_moves(game, m), reverse=True)
+            tasks = [(legal_moves[i::self.workers], 1, None)
+                     for i in range(min(self.workers, len(legal_moves)))]
+        else:
+            tasks = [(legal_moves, 1 + i % 2, i or None) for i in range(self.workers)]
+        futures = [self._pool.submit(_search_worker, root, moves, deadline, start_depth, seed)
+                   for moves, start_depth, seed in tasks]
+
+        done, _ = wait(futures, timeout=max(0., now + budget - timeit.default_timer()))
+        results = [f.result() for f in futures if f in done and f.result()]
+        return self._merge_results(results) or legal_moves[0]
+
+    def _merge_results(self, results):
+        """Return the best move among the iterations completed by the
+        workers, or None if no worker completed an iteration.
+        """
+        if not results:
+            return None
+        if self.parallel_mode == "root":
+            # Scores are only comparable between iterations of equal depth
+            depth = min(r[-1][0] for r in results)
+            candidates = [next(e for e in r if e[0] == depth) for r in results]
+        else:
+            depth = max(r[-1][0] for r in results)
+            candidates = [r[-1] for r in results if r[-1][0] == depth]
+        return max(candidates, key=lambda e: e[1])[2]
@@ -0,0 +1,176 @@
+"""
+This file contains the opt-in instrumentation of the search of the agents of
+game_agent.py, exported as one JSON line per game.
+
+The module depends on `json` and `timeit`, which the Project Assistant
+sandbox does not allow, so it is kept out of game_agent.py; use
+`from search_stats import SearchStats`.
+"""
+import json
+import timeit
+
+
+class SearchStats:
+    """Opt-in instrumentation of the search of a player, exported as one
+    JSON line per game.
+
+    For every move the record holds the ply, the depth of the last completed
+    iteration, the nodes visited by each iteration (`nodes[d - 1]` for depth
+    d), the effective branching factor of the last two iterations, the
+    fraction of beta cutoffs produced by the first move searched, the time
+    (in milliseconds) spent in the score function, in move generation and
+    in board updates (push, pop and copies), and the time left when the
+    move was returned.
+
+    The search board is replaced by an instrumented copy for the move, so a
+    player without stats pays no instrumentation cost.
+
+    Parameters
+    ----------
+    path : str (optional)
+        The file that `end_game()` appends the record of each game to.
+
+    label : str (optional)
+        A name recorded with every game (e.g., the name of the agent).
+    """
+
+    def __init__(self, path=None, label=None):
+        self.path = path
+        self.label = label
+        self.moves = []
+        self._board_classes = {}
+        self._reset_move()
+
+    def _reset_move(self):
+        self.nodes = []
+        self.pushes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.score_time = 0.
+        self.movegen_time = 0.
+        self.board_time = 0.
+        self._iteration_pushes = 0
+        self._move_start = None
+
+    def start_move(self, game):
+        """Start recording a move and return the instrumented copy of the
+        board to search.
+        """
+        self._reset_move()
+        self._ply = game.move_count
+        self._move_start = timeit.default_timer()
+        board = game.copy()
+        board.__class__ = self._board_class(type(game))
+        return board
+
+    def record_iteration(self):
+        """Record the nodes of a completed iteration of iterative deepening."""
+        self.nodes.append(self.pushes - self._iteration_pushes + 1)
+        self._iteration_pushes = self.pushes
+
+    def record_cutoff(self, first_move):
+        """Record a beta cutoff, and whether the first move searched at the
+        node produced it.
+        """
+        self.cutoffs += 1
+        self.first_move_cutoffs += first_move
+
+    def end_move(self, time_left):
+        """Store the record of the move returned with `time_left` ms left."""
+        nodes = self.nodes
+        self.moves.append({
+            "ply": self._ply,
+            "depth": len(nodes),
+            "nodes": nodes,
+            "ebf": nodes[-1] / nodes[-2] if len(nodes) > 1 else None,
+            "first_move_cutoffs": (self.first_move_cutoffs / self.cutoffs
+                                   if self.cutoffs else None),
+            "search_ms": 1000 * (timeit.default_timer() - self._move_start),
+            "score_ms": 1000 * self.score_time,
+            "movegen_ms": 1000 * self.movegen_time,
+            "board_ms": 1000 * self.board_time,
+            "margin_ms": time_left,
+        })
+        self._reset_move()
+
+    def end_game(self, **info):
+        """Return the record of the game (the moves plus any extra entries),
+        append it to `path` as a JSON line, and start a new game.
+        """
+        record = dict(info, label=self.label, moves=self.moves)
+        self.moves = []
+        if self.path is not None:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        return record
+
+    def timed_score(self, score_fn):
+        """Wrap a score function so that its time (less the move generation
+        it does) is recorded.
+        """
+        return _TimedScore(score_fn, self)
+
+    def _board_class(self, base):
+        """Return the subclass of a board class whose move generation and
+        updates are timed, and whose pushes are counted as nodes.
+        """
+        cls = self._board_classes.get(base)
+        if cls is None:
+            stats = self
+            timer = timeit.default_timer
+
+            def get_legal_moves(board, player=None):
+                start = timer()
+                moves = base.get_legal_moves(board, player)
+                stats.movegen_time += timer() - start
+                return moves
+
+            def get_legal_move_mask(board, player=None):
+                start = timer()
+                mask = base.get_legal_move_mask(board, player)
+                stats.movegen_time += timer() - start
+                return mask
+
+            def push(board, move):
+                start = timer()
+                base.push(board, move)
+                stats.board_time += timer() - start
+                stats.pushes += 1
+
+            def pop(board):
+                start = timer()
+                base.pop(board)
+                stats.board_time += timer() - start
+
+            def copy(board):
+                start = timer()
+                new_board = base.copy(board)
+                stats.board_time += timer() - start
+                return new_board
+
+            cls = self._board_classes[base] = type("Instrumented" + base.__name__, (base,), {
+                "__slots__": (), "get_legal_moves": get_legal_moves,
+                "get_legal_move_mask": get_legal_move_mask,
+                "push": push, "pop": pop, "copy": copy})
+        return cls
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_board_classes"] = {}
+        return state
+
+
+class _TimedScore:
+    """A score function whose calls are timed by a `SearchStats`."""
+
+    def __init__(self, score_fn, stats):
+        self.score_fn = score_fn
+        self.stats = stats
+
+    def __call__(self, game, player):
+        stats = self.stats
+        movegen = stats.movegen_time
+        start = timeit.default_timer()
+        value = self.score_fn(game, player)
+        stats.score_time += timeit.default_timer() - start - (stats.movegen_time - movegen)
+        return value
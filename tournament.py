@@ -11,17 +11,25 @@ players, and the players play each match twice -- once as the first player and
 once as the second player.  Randomizing the openings and switching the player
 order corrects for imbalances due to both starting position and initiative.
 """
+import argparse
 import itertools
+import math
+import multiprocessing
+import os
 import random
 import warnings
 
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 
 from isolation import Board
 from sample_players import (RandomPlayer, open_move_score,
                             improved_score, center_score)
-from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
-                        custom_score_2, custom_score_3)
+from game_agent import (MinimaxPlayer, AlphaBetaPlayer, MoveOrdering,
+                        custom_score, custom_score_2, custom_score_3)
+from competition_agent import CustomPlayer
+from search_stats import SearchStats
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
@@ -36,53 +44,153 @@ game_agent.py.
 
 Agent = namedtuple("Agent", ["player", "name"])
 
+# One game of a round: the indices of the cpu and test players in the list
+# of tournament players, whether the cpu agent moves first, the two opening
+# moves applied before play starts, and the seed of the global RNG.
+GameSpec = namedtuple("GameSpec", ["round", "cpu", "test", "cpu_first",
+                                   "opening", "seed"])
 
-def play_round(cpu_agent, test_agents, win_counts, num_matches):
-    """Compare the test agents to the cpu agent in "fair" matches.
+_worker_players = None
+_worker_time_limit = TIME_LIMIT
+
+
+def random_opening(rng):
+    """Choose a random move and response to initialize a match."""
+    game = Board("player_1", "player_2")
+    for _ in range(2):
+        game.apply_move(rng.choice(game.get_legal_moves()))
+    return [game.get_player_location("player_1"),
+            game.get_player_location("player_2")]
+
+
+def round_games(round_idx, cpu_idx, test_indices, num_matches, seed):
+    """List the games of a round of "fair" matches between a cpu agent and
+    each test agent.
 
     "Fair" matches use random starting locations and force the agents to
     play as both first and second player to control for advantages resulting
     from choosing better opening moves or having first initiative to move.
+    Every random choice is drawn from `seed`, so a round is the same whether
+    its games are played serially or in parallel.
     """
-    timeout_count = 0
-    forfeit_count = 0
+    rng = random.Random(seed)
+    games = []
     for _ in range(num_matches):
+        opening = random_opening(rng)
+        for test_idx in test_indices:
+            for cpu_first in (True, False):
+                games.append(GameSpec(round_idx, cpu_idx, test_idx, cpu_first,
+                                      opening, rng.getrandbits(32)))
+    return games
 
-        games = sum([[Board(cpu_agent.player, agent.player),
-                      Board(agent.player, cpu_agent.player)]
-                    for agent in test_agents], [])
 
-        # initialize all games with a random move and response
-        for _ in range(2):
-            move = random.choice(games[0].get_legal_moves())
-            for game in games:
-                game.apply_move(move)
-
-        # play all games and tally the results
-        for game in games:
-            winner, _, termination = game.play(time_limit=TIME_LIMIT)
-            win_counts[winner] += 1
-
-        if termination == "timeout":
-            timeout_count += 1
-        elif winner not in test_agents and termination == "forfeit":
-            forfeit_count += 1
-
-    return timeout_count, forfeit_count
+def play_game(players, spec, time_limit=TIME_LIMIT):
+    """Play one game of the tournament and return the spec, whether the test
+    agent won, and the termination reason reported by `Board.play()`.
+    """
+    cpu_player, test_player = players[spec.cpu], players[spec.test]
+    random.seed(spec.seed)
+    if spec.cpu_first:
+        game = Board(cpu_player, test_player, seed=spec.seed, shuffle=True)
+    else:
+        game = Board(test_player, cpu_player, seed=spec.seed, shuffle=True)
+    for move in spec.opening:
+        game.apply_move(move)
+    winner, _, termination = game.play(time_limit=time_limit)
+    for player, opponent in ((test_player, spec.cpu), (cpu_player, spec.test)):
+        if getattr(player, "stats", None) is not None:
+            player.stats.end_game(round=spec.round, opponent=opponent, seed=spec.seed,
+                                  won=winner is player, termination=termination)
+    return spec, winner is test_player, termination
+
+
+def physical_cores():
+    """Return the ids of the CPUs available to this process, keeping one
+    logical CPU per physical core (hyperthread siblings share a core and
+    would skew the per-move time limits).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    try:
+        with open("/proc/cpuinfo") as f:
+            blocks = f.read().strip().split("\n\n")
+    except OSError:
+        return cpus
+
+    cores = {}
+    for block in blocks:
+        info = dict(line.split(":", 1) for line in block.splitlines() if ":" in line)
+        info = {k.strip(): v.strip() for k, v in info.items()}
+        if "processor" not in info or "core id" not in info:
+            return cpus
+        cpu = int(info["processor"])
+        core = (info.get("physical id"), info["core id"])
+        if cpu in cpus and core not in cores:
+            cores[core] = cpu
+    return sorted(cores.values()) or cpus
+
+
+def _init_worker(players, time_limit, cpus, counter):
+    """Store the tournament players in a worker process and pin the worker
+    to its own core.
+    """
+    global _worker_players, _worker_time_limit
+    _worker_players = players
+    _worker_time_limit = time_limit
+    with counter.get_lock():
+        idx = counter.value
+        counter.value += 1
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpus[idx % len(cpus)]})
 
 
-def update(total_wins, wins):
-    for player in total_wins:
-        total_wins[player] += wins[player]
-    return total_wins
+def _play_worker_game(spec):
+    return play_game(_worker_players, spec, _worker_time_limit)
 
 
-def play_matches(cpu_agents, test_agents, num_matches):
+@contextmanager
+def game_runner(players, workers=1, time_limit=TIME_LIMIT):
+    """Provide a function that plays a list of games and returns an iterator
+    over their results in the order of the list, either in this process or
+    in a pool of `workers` processes kept open for the whole block.
+    """
+    if workers <= 1:
+        yield lambda games: (play_game(players, spec, time_limit) for spec in games)
+        return
+
+    cpus = physical_cores()
+    if workers > len(cpus):
+        warnings.warn(("Limiting the tournament to {} workers (one per physical " +
+                       "core) to keep the move time limits fair.").format(len(cpus)))
+        workers = len(cpus)
+    counter = multiprocessing.Value("i", 0)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(players, time_limit, cpus, counter)) as pool:
+        yield lambda games: pool.map(_play_worker_game, games)
+
+
+def play_matches(cpu_agents, test_agents, num_matches, workers=1, seed=None,
+                 time_limit=TIME_LIMIT):
     """Play matches between the test agent and each cpu_agent individually. """
-    total_wins = {agent.player: 0 for agent in test_agents}
+    players = [a.player for a in cpu_agents] + [a.player for a in test_agents]
+    test_indices = list(range(len(cpu_agents), len(players)))
+    rng = random.Random(seed)
+    games = sum([round_games(idx, idx, test_indices, num_matches, rng.getrandbits(32))
+                 for idx in range(len(cpu_agents))], [])
+    with game_runner(players, workers, time_limit) as run:
+        _print_rounds(cpu_agents, test_agents, num_matches, run(games))
+
+
+def _print_rounds(cpu_agents, test_agents, num_matches, results):
+    """Tally the game results of each round and print the match table."""
+    test_indices = list(range(len(cpu_agents), len(cpu_agents) + len(test_agents)))
+    total_wins = {idx: 0 for idx in test_indices}
     total_timeouts = 0.
     total_forfeits = 0.
     total_matches = 2 * num_matches * len(cpu_agents)
+    games_per_round = 2 * num_matches * len(test_agents)
 
     print("\n{:^9}{:^13}{:^13}{:^13}{:^13}{:^13}".format(
         "Match #", "Opponent", test_agents[0].name, test_agents[1].name,
@@ -91,29 +199,31 @@ def play_matches(cpu_agents, test_agents, num_matches):
           .format("", "", *(["Won", "Lost"] * 4)))
 
     for idx, agent in enumerate(cpu_agents):
-        wins = {test_agents[0].player: 0,
-                test_agents[1].player: 0,
-                test_agents[2].player: 0,
-                test_agents[3].player: 0,
-                agent.player: 0}
+        wins = {test_idx: 0 for test_idx in test_indices}
 
         print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
 
-        counts = play_round(agent, test_agents, wins, num_matches)
-        total_timeouts += counts[0]
-        total_forfeits += counts[1]
-        total_wins = update(total_wins, wins)
+        for _ in range(games_per_round):
+            spec, test_won, termination = next(results)
+            wins[spec.test] += test_won
+            if termination == "timeout":
+                total_timeouts += 1
+            elif not test_won and termination == "forfeit":
+                total_forfeits += 1
+
+        for test_idx in test_indices:
+            total_wins[test_idx] += wins[test_idx]
         _total = 2 * num_matches
-        round_totals = sum([[wins[agent.player], _total - wins[agent.player]]
-                            for agent in test_agents], [])
+        round_totals = sum([[wins[test_idx], _total - wins[test_idx]]
+                            for test_idx in test_indices], [])
         print(" {:^5}| {:^5} {:^5}| {:^5} {:^5}| {:^5} {:^5}| {:^5}"
               .format(*round_totals))
 
     print("-" * 74)
     print("{:^9}{:^13}{:^13}{:^13}{:^13}{:^13}\n".format(
         "", "Win Rate:",
-        *["{:.1f}%".format(100 * total_wins[a.player] / total_matches)
-          for a in test_agents]
+        *["{:.1f}%".format(100 * total_wins[test_idx] / total_matches)
+          for test_idx in test_indices]
     ))
 
     if total_timeouts:
@@ -126,15 +236,231 @@ def play_matches(cpu_agents, test_agents, num_matches):
                "legal moves available to play.\n").format(total_forfeits))
 
 
+def wilson_interval(wins, games, z=1.96):
+    """Return the Wilson score interval (low, high) of a win rate; z=1.96
+    gives a 95% confidence interval.
+    """
+    if not games:
+        return 0., 1.
+    p = wins / games
+    center = p + z * z / (2 * games)
+    margin = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games))
+    scale = 1 + z * z / games
+    return max(0., (center - margin) / scale), min(1., (center + margin) / scale)
+
+
+def elo_ratings(pair_wins, prior=1., iterations=1000):
+    """Fit Elo ratings to the results of the games between each pair of
+    players with a Bradley-Terry model.
+
+    Parameters
+    ----------
+    pair_wins : dict<(hashable, hashable), (int, int)>
+        The number of games won by each of the two players of a pair.
+
+    prior : float (optional)
+        Virtual wins added to both sides of every pair, which keeps the
+        ratings of undefeated (or winless) players finite.
+
+    Returns
+    -------
+    dict<hashable, float>
+        The Elo rating of every player, centered on an average of zero.
+    """
+    players = sorted(set(itertools.chain(*pair_wins)), key=str)
+    strength = {p: 1. for p in players}
+    for _ in range(iterations):
+        for p in players:
+            wins = denom = 0.
+            for (a, b), (wins_a, wins_b) in pair_wins.items():
+                if p not in (a, b):
+                    continue
+                other = b if p == a else a
+                wins += (wins_a if p == a else wins_b) + prior
+                denom += (wins_a + wins_b + 2 * prior) / (strength[p] + strength[other])
+            strength[p] = wins / denom
+    ratings = {p: 400 * math.log10(strength[p]) for p in players}
+    mean = sum(ratings.values()) / len(ratings)
+    return {p: r - mean for p, r in ratings.items()}
+
+
+def sprt_llr(wins, losses, elo0, elo1):
+    """Return the log-likelihood ratio of the hypothesis that the Elo
+    difference of a pairing is elo1 against the hypothesis that it is elo0,
+    given the games won and lost.
+    """
+    p0 = 1 / (1 + 10 ** (-elo0 / 400))
+    p1 = 1 / (1 + 10 ** (-elo1 / 400))
+    return wins * math.log(p1 / p0) + losses * math.log((1 - p1) / (1 - p0))
+
+
+class SequentialTest(object):
+    """Run a sequential probability ratio test (SPRT) on every pairing of a
+    tournament, deciding whether the test agent is elo1 stronger than the
+    cpu agent (H1) or at most elo0 stronger (H0).
+
+    Parameters
+    ----------
+    pairs : list<(int, int)>
+        The (cpu, test) player indices of the pairings.
+
+    max_matches : int
+        The number of matches after which an undecided pairing stops.
+
+    elo0, elo1 : float (optional)
+        The Elo differences of the two hypotheses.
+
+    alpha, beta : float (optional)
+        The probabilities of accepting H1 when H0 holds, and the reverse.
+
+    Attributes
+    ----------
+    wins : dict<(int, int), [int, int]>
+        The games won by the test agent and by the cpu agent of each pairing.
+
+    matches : dict<(int, int), int>
+        The number of matches recorded for each pairing.
+
+    decisions : dict<(int, int), str>
+        "H1", "H0" or "--" (undecided after `max_matches` matches) for each
+        pairing that has stopped.
+    """
+
+    def __init__(self, pairs, max_matches, elo0=0., elo1=50., alpha=0.05, beta=0.05):
+        self.pairs = list(pairs)
+        self.max_matches = max_matches
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.wins = {pair: [0, 0] for pair in self.pairs}
+        self.matches = {pair: 0 for pair in self.pairs}
+        self.decisions = {}
+        self._lower = math.log(beta / (1 - alpha))
+        self._upper = math.log((1 - beta) / alpha)
+
+    def pending(self):
+        """Return the pairings that have not stopped yet."""
+        return [pair for pair in self.pairs if pair not in self.decisions]
+
+    def record(self, results):
+        """Record a list of game results `(spec, test_won, termination)`,
+        where the two games of each match are consecutive.
+
+        The results are replayed a match at a time, and the results of a
+        pairing that has stopped are ignored, so every pairing stops at the
+        same match whatever the number of matches recorded per call is.
+        """
+        for first, second in zip(results[::2], results[1::2]):
+            pair = (first[0].cpu, first[0].test)
+            if pair in self.decisions:
+                continue
+            self.matches[pair] += 1
+            for _, test_won, _ in (first, second):
+                self.wins[pair][0 if test_won else 1] += 1
+            llr = sprt_llr(self.wins[pair][0], self.wins[pair][1], self.elo0, self.elo1)
+            if llr >= self._upper:
+                self.decisions[pair] = "H1"
+            elif llr <= self._lower:
+                self.decisions[pair] = "H0"
+            elif self.matches[pair] >= self.max_matches:
+                self.decisions[pair] = "--"
+
+
+def play_sprt(cpu_agents, test_agents, max_matches, workers=1, seed=None,
+              elo0=0., elo1=50., alpha=0.05, beta=0.05, time_limit=TIME_LIMIT):
+    """Play fair matches between each test agent and each cpu agent until a
+    sequential probability ratio test (see `SequentialTest`) decides whether
+    the test agent is elo1 stronger than the cpu agent (H1) or at most elo0
+    stronger (H0), or the pairing reaches `max_matches` matches. Then print
+    the win rate of every pairing with its 95% Wilson interval, and the Elo
+    ratings fitted to all games.
+    """
+    players = [a.player for a in cpu_agents] + [a.player for a in test_agents]
+    names = ([a.name + " (cpu)" for a in cpu_agents] +
+             [a.name for a in test_agents])
+    pairs = [(c, t) for c in range(len(cpu_agents))
+             for t in range(len(cpu_agents), len(players))]
+    rng = random.Random(seed)
+    pair_rngs = {pair: random.Random(rng.getrandbits(32)) for pair in pairs}
+    sprt = SequentialTest(pairs, max_matches, elo0, elo1, alpha, beta)
+    batch = max(1, workers)
+
+    with game_runner(players, workers, time_limit) as run:
+        while sprt.pending():
+            games = []
+            for idx, pair in enumerate(pairs):
+                if pair in sprt.decisions:
+                    continue
+                for _ in range(min(batch, max_matches - sprt.matches[pair])):
+                    games += round_games(idx, pair[0], [pair[1]], 1,
+                                         pair_rngs[pair].getrandbits(32))
+            sprt.record(list(run(games)))
+
+    wins, decisions = sprt.wins, sprt.decisions
+    print("\n{:^13}{:^17}{:^8}{:^11}{:^10}{:^17}{:^8}".format(
+        "Agent", "Opponent", "Games", "Won-Lost", "Win Rate", "95% CI", "SPRT"))
+    for pair in pairs:
+        won, lost = wins[pair]
+        low, high = wilson_interval(won, won + lost)
+        print("{:^13}{:^17}{:^8}{:^11}{:^10}{:^17}{:^8}".format(
+            names[pair[1]], names[pair[0]], won + lost,
+            "{}-{}".format(won, lost), "{:.1f}%".format(100 * won / (won + lost)),
+            "{:.1f}% - {:.1f}%".format(100 * low, 100 * high), decisions[pair]))
+
+    ratings = elo_ratings({(t, c): tuple(wins[(c, t)]) for c, t in pairs})
+    print("\n{:^17}{:^8}".format("Agent", "Elo"))
+    for idx in sorted(ratings, key=ratings.get, reverse=True):
+        print("{:^17}{:^+8.0f}".format(names[idx], ratings[idx]))
+    print(("\nSPRT: H1 = at least {:+.0f} Elo stronger than the opponent, H0 = at " +
+           "most {:+.0f} Elo, -- = undecided after {} matches\n").format(
+        elo1, elo0, max_matches))
+
+
 def main():
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="number of games played in parallel (at most one " +
+                             "per physical core)")
+    parser.add_argument("-n", "--matches", type=int, default=NUM_MATCHES,
+                        help="number of matches against each opponent")
+    parser.add_argument("-s", "--seed", type=int, default=None,
+                        help="seed of the random openings (and of each game)")
+    parser.add_argument("--sprt", action="store_true",
+                        help="play each pairing until a sequential probability " +
+                             "ratio test is decisive (at most --matches matches), " +
+                             "and report confidence intervals and Elo ratings")
+    parser.add_argument("--elo0", type=float, default=0.,
+                        help="Elo difference of the SPRT null hypothesis")
+    parser.add_argument("--elo1", type=float, default=50.,
+                        help="Elo difference of the SPRT alternative hypothesis")
+    parser.add_argument("--pvs", action="store_true",
+                        help="add an alpha-beta agent using principal variation " +
+                             "search and move ordering to the cpu agents")
+    parser.add_argument("--mcts", action="store_true",
+                        help="add the Monte Carlo tree search agent of " +
+                             "competition_agent.py to the cpu agents")
+    parser.add_argument("--stats", metavar="PATH", default=None,
+                        help="record the search statistics of the test agents " +
+                             "and append them to PATH, one JSON line per game")
+    parser.add_argument("--nodes", type=int, default=None,
+                        help="search a fixed number of nodes per move instead of " +
+                             "using the clock (with --seed, every run plays the " +
+                             "same games)")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="stop iterative deepening at this depth")
+    args = parser.parse_args()
+    if args.matches < 1:
+        parser.error("--matches must be at least 1")
+
+    def stats(name):
+        return SearchStats(args.stats, label=name) if args.stats else None
 
     # Define two agents to compare -- these agents will play from the same
     # starting position against the same adversaries in the tournament
     test_agents = [
-        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score), "AB_Custom"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_2), "AB_Custom_2"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3")
+        Agent(AlphaBetaPlayer(score_fn=improved_score, stats=stats("AB_Improved")), "AB_Improved"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score, stats=stats("AB_Custom")), "AB_Custom"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_2, stats=stats("AB_Custom_2")), "AB_Custom_2"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_3, stats=stats("AB_Custom_3")), "AB_Custom_3")
     ]
 
     # Define a collection of agents to compete against the test agents
@@ -147,12 +473,35 @@ def main():
         Agent(AlphaBetaPlayer(score_fn=center_score), "AB_Center"),
         Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved")
     ]
+    if args.pvs:
+        cpu_agents.append(Agent(AlphaBetaPlayer(score_fn=improved_score, search="pvs",
+                                                move_ordering=MoveOrdering()),
+                                "PVS_Improved"))
+    if args.mcts:
+        cpu_agents.append(Agent(CustomPlayer(timeout=10.), "MCTS"))
+
+    # A fixed search budget replaces the clock, so the move time limit is lifted
+    time_limit = TIME_LIMIT
+    if args.nodes is not None or args.depth is not None:
+        if args.mcts:
+            parser.error("the MCTS agent has no fixed search budget; " +
+                         "--nodes and --depth cannot be used with --mcts")
+        for agent in cpu_agents + test_agents:
+            if isinstance(agent.player, AlphaBetaPlayer):
+                agent.player.node_limit = args.nodes
+                agent.player.max_depth = args.depth
+        time_limit = float("inf")
 
     print(DESCRIPTION)
     print("{:^74}".format("*************************"))
     print("{:^74}".format("Playing Matches"))
     print("{:^74}".format("*************************"))
-    play_matches(cpu_agents, test_agents, NUM_MATCHES)
+    if args.sprt:
+        play_sprt(cpu_agents, test_agents, args.matches, workers=args.workers,
+                  seed=args.seed, elo0=args.elo0, elo1=args.elo1, time_limit=time_limit)
+    else:
+        play_matches(cpu_agents, test_agents, args.matches, workers=args.workers,
+                     seed=args.seed, time_limit=time_limit)
 
 
 if __name__ == "__main__":